@@ -1,7 +1,24 @@
 """spotrun -- Burst compute to AWS spot instances."""
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from spotrun.exceptions import SpotCapacityError
-from spotrun.pricing import select_instance, estimate_cost
-from spotrun.session import Session
+
+if TYPE_CHECKING:
+    from spotrun.pricing import estimate_cost, select_instance
+    from spotrun.session import Session
 
 __all__ = ["Session", "SpotCapacityError", "select_instance", "estimate_cost"]
+
+
+def __getattr__(name: str):
+    # Resolved on first access so `import spotrun` doesn't load boto3/rich
+    if name == "Session":
+        from spotrun.session import Session
+        return Session
+    if name in ("select_instance", "estimate_cost"):
+        from spotrun import pricing
+        return getattr(pricing, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
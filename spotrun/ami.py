@@ -3,21 +3,31 @@
 from __future__ import annotations
 
 import os
+import shlex
 import time
 from pathlib import Path
 
+from botocore.exceptions import ClientError
 from rich.console import Console
 
-from spotrun.ec2 import EC2Manager
+from spotrun.cache import cache_delete, cache_get, cache_put
+from spotrun.ec2 import AMI_CACHE_FILE, EC2Manager
 from spotrun.sync import DataSync
 
 console = Console()
 
+# Project AMIs change whenever the user rebuilds, so keep this short
+_PROJECT_AMI_TTL = 3600
+
 # Bootstrap script bundled inside the package
 _BUNDLED_BOOTSTRAP = Path(__file__).resolve().parent / "scripts" / "bootstrap.sh"
 # Fallback: development repo layout
 _REPO_BOOTSTRAP = Path(__file__).resolve().parent.parent / "scripts" / "bootstrap.sh"
 
+# Dependency installer baked into every AMI (see Session.install_deps)
+_BUNDLED_INSTALL_DEPS = Path(__file__).resolve().parent / "scripts" / "install_deps.py"
+INSTALL_DEPS_BIN = "/usr/local/bin/spotrun-install-deps"
+
 
 def _default_bootstrap_path() -> str | None:
     """Find the default bootstrap script, checking package-local then repo layout."""
@@ -34,8 +44,20 @@ class AMIManager:
     def __init__(self, ec2: EC2Manager) -> None:
         self.ec2 = ec2
 
+    def _cache_key(self, project_tag: str, arch: str) -> str:
+        return "|".join(("self", self.ec2.region, project_tag, arch))
+
     def find_existing(self, project_tag: str = "spotrun", arch: str = "x86_64") -> str | None:
-        """Find the most recent AMI tagged with the project tag and matching arch."""
+        """Find the most recent AMI tagged with the project tag and matching arch.
+
+        Hits are cached on disk for an hour; misses are never cached so a
+        freshly built AMI is picked up immediately.
+        """
+        cache_key = self._cache_key(project_tag, arch)
+        cached = cache_get(AMI_CACHE_FILE, cache_key, _PROJECT_AMI_TTL)
+        if cached:
+            return cached["ami_id"]
+
         resp = self.ec2.client.describe_images(
             Owners=["self"],
             Filters=[
@@ -47,8 +69,13 @@ class AMIManager:
         images = resp.get("Images", [])
         if not images:
             return None
-        images.sort(key=lambda i: i["CreationDate"], reverse=True)
-        return images[0]["ImageId"]
+        ami_id = max(images, key=lambda i: i["CreationDate"])["ImageId"]
+        cache_put(AMI_CACHE_FILE, cache_key, ami_id=ami_id)
+        return ami_id
+
+    def forget(self, project_tag: str = "spotrun", arch: str = "x86_64") -> None:
+        """Drop the cached AMI for this project/arch (e.g. after it was deregistered)."""
+        cache_delete(AMI_CACHE_FILE, self._cache_key(project_tag, arch))
 
     def create(
         self,
@@ -65,7 +92,7 @@ class AMIManager:
         1. Launch a builder instance (t3.medium for x86, t4g.medium for arm64)
         2. SCP and run the bootstrap script
         3. Create an AMI from the configured instance
-        4. Clean up the builder
+        4. Terminate the builder as soon as the AMI snapshots have started
         """
         base_ami = self.ec2.get_ubuntu_ami(arch=arch)
         console.print(f"Base AMI: [bold]{base_ami}[/bold] ({arch})")
@@ -82,6 +109,8 @@ class AMIManager:
             )
             console.print(f"Builder instance: [bold]{builder_id}[/bold]")
 
+        builder_terminated = False
+        sync: DataSync | None = None
         try:
             with console.status("Waiting for builder to start..."):
                 ip = self.ec2.wait_for_running(builder_id)
@@ -100,14 +129,27 @@ class AMIManager:
                     "or ensure scripts/bootstrap.sh exists in the spotrun package."
                 )
 
+            # One scp for every file, then one SSH session that stages them and
+            # runs the bootstrap (each scp/ssh is a full handshake)
+            uploads = [script_path, str(_BUNDLED_INSTALL_DEPS)]
+            remote_script = f"/tmp/{os.path.basename(script_path)}"
+            setup_cmds = [
+                f"sudo install -m 755 /tmp/{_BUNDLED_INSTALL_DEPS.name} {INSTALL_DEPS_BIN}",
+            ]
+            if requirements_file:
+                uploads.append(requirements_file)
+                remote_name = os.path.basename(requirements_file)
+                setup_cmds += [
+                    "sudo install -d -o ubuntu -g ubuntu /opt/project",
+                    f"mv /tmp/{shlex.quote(remote_name)} /opt/project/",
+                ]
+            setup_cmds.append(
+                f"chmod +x {shlex.quote(remote_script)} && {shlex.quote(remote_script)}"
+            )
+
             with console.status("Running bootstrap script..."):
-                sync.scp_to(script_path, "/tmp/bootstrap.sh")
-                if requirements_file:
-                    sync.ssh_run("sudo mkdir -p /opt/project", capture=True)
-                    sync.ssh_run("sudo chown ubuntu:ubuntu /opt/project", capture=True)
-                    remote_name = os.path.basename(requirements_file)
-                    sync.scp_to(requirements_file, f"/opt/project/{remote_name}")
-                exit_code = sync.ssh_run("chmod +x /tmp/bootstrap.sh && /tmp/bootstrap.sh")
+                sync.scp_many(uploads, "/tmp")
+                exit_code = sync.ssh_run(" && ".join(setup_cmds))
                 if exit_code != 0:
                     raise RuntimeError(f"Bootstrap script failed with exit code {exit_code}")
 
@@ -120,23 +162,59 @@ class AMIManager:
                     InstanceId=builder_id,
                     Name=ami_name,
                     Description=f"{project_tag} base image built at {timestamp}",
+                    TagSpecifications=[{
+                        "ResourceType": "image",
+                        "Tags": [{"Key": "Project", "Value": project_tag}],
+                    }],
                 )
                 ami_id = resp["ImageId"]
                 console.print(f"AMI: [bold]{ami_id}[/bold] ({ami_name})")
 
+                # Once the snapshots have started they no longer need the
+                # builder, so stop paying for it while the AMI finishes
+                self._wait_for_snapshots(ami_id)
+                self.ec2.terminate_instance(builder_id)
+                builder_terminated = True
+
                 waiter = self.ec2.client.get_waiter("image_available")
+                # Poll every 8s (waiter default is 15s); same 20 min ceiling
                 waiter.wait(
                     ImageIds=[ami_id],
-                    WaiterConfig={"Delay": 15, "MaxAttempts": 80},
+                    WaiterConfig={"Delay": 8, "MaxAttempts": 150},
                 )
 
-            # Tag the AMI
-            self.ec2.client.create_tags(
-                Resources=[ami_id],
-                Tags=[{"Key": "Project", "Value": project_tag}],
-            )
-
+            cache_put(AMI_CACHE_FILE, self._cache_key(project_tag, arch), ami_id=ami_id)
             console.print(f"[green]AMI [bold]{ami_id}[/bold] ready[/green]")
             return ami_id
         finally:
-            self.ec2.terminate_instance(builder_id)
+            if sync is not None:
+                sync.close()
+            if not builder_terminated:
+                self.ec2.terminate_instance(builder_id)
+
+    def _wait_for_snapshots(self, ami_id: str, timeout: int = 600) -> None:
+        """Wait until every EBS volume of a pending AMI has a snapshot assigned.
+
+        Snapshots are point-in-time, so from here on the source instance can
+        go away without affecting the image.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                resp = self.ec2.client.describe_images(ImageIds=[ami_id])
+            except ClientError as e:
+                # Eventual consistency: the new image id may not be visible yet
+                if e.response["Error"]["Code"] != "InvalidAMIID.NotFound":
+                    raise
+            else:
+                for image in resp.get("Images", []):
+                    if image["State"] == "available":
+                        return
+                    if image["State"] == "failed":
+                        reason = image.get("StateReason", {}).get("Message", "unknown reason")
+                        raise RuntimeError(f"AMI {ami_id} creation failed: {reason}")
+                    volumes = [m["Ebs"] for m in image.get("BlockDeviceMappings", []) if "Ebs" in m]
+                    if volumes and all(v.get("SnapshotId") for v in volumes):
+                        return
+            time.sleep(5)
+        raise TimeoutError(f"Snapshots for AMI {ami_id} did not start within {timeout}s")
@@ -0,0 +1,62 @@
+"""Small JSON caches stored under ~/.spotrun."""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Serializes read-modify-write cycles within this process; the atomic rename
+# keeps concurrent processes from ever seeing a half-written file.
+_cache_lock = threading.Lock()
+
+
+def _load(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _store(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def cache_get(path: Path, key: str, ttl: float) -> dict | None:
+    """Return the entry stored under *key*, or None if missing or older than *ttl* seconds."""
+    with _cache_lock:
+        entry = _load(path).get(key)
+    if not isinstance(entry, dict) or time.time() - entry.get("ts", 0) >= ttl:
+        return None
+    return entry
+
+
+def cache_put(path: Path, key: str, **values) -> None:
+    """Store *values* under *key*, stamped with the current time."""
+    with _cache_lock:
+        data = _load(path)
+        data[key] = {"ts": time.time(), **values}
+        _store(path, data)
+
+
+def cache_delete(path: Path, key: str) -> None:
+    """Drop *key* from the cache file if present."""
+    with _cache_lock:
+        data = _load(path)
+        if data.pop(key, None) is not None:
+            _store(path, data)
@@ -6,10 +6,9 @@ from typing import Optional
 
 import typer
 from rich.console import Console
-from rich.table import Table
 
-from spotrun.pricing import COMPUTE_INSTANCES, all_instance_types, select_instance
-from spotrun.session import Session
+# Heavy modules (spotrun.session pulls in boto3) are imported inside each
+# command so `spotrun --help` and shell completion start instantly.
 
 app = typer.Typer(
     name="spotrun",
@@ -34,6 +33,8 @@ def launch(
     no_install: bool = typer.Option(False, "--no-install", help="Skip automatic Python dependency installation after sync"),
 ) -> None:
     """Launch a spot instance, optionally sync files and run a command."""
+    from spotrun.session import Session
+
     session = Session(
         workers=workers,
         project_tag=project_tag,
@@ -128,13 +129,15 @@ def setup(
 def prices(
     workers: int = typer.Option(4, "--workers", "-w", min=1, help="Number of parallel workers"),
     arm: bool = typer.Option(False, "--arm", help="Include ARM/Graviton instances"),
+    refresh: bool = typer.Option(False, "--refresh", help="Ignore cached prices and query AWS again"),
 ) -> None:
     """Show current spot prices for compute instances."""
     import os
 
-    from botocore.exceptions import ClientError
+    from rich.table import Table
 
-    from spotrun.ec2 import CANDIDATE_REGIONS, EC2Manager
+    from spotrun.ec2 import EC2Manager, scan_region_prices
+    from spotrun.pricing import COMPUTE_INSTANCES, all_instance_types, select_instance
 
     instance_type, vcpus = select_instance(workers, include_arm=arm)
     explicit_region = os.environ.get("AWS_REGION")
@@ -143,7 +146,7 @@ def prices(
     if explicit_region:
         # Single-region view (explicit region set)
         ec2 = EC2Manager(region=explicit_region)
-        spot_prices = ec2.get_spot_prices(all_instance_types(include_arm=arm))
+        spot_prices = ec2.get_spot_prices(all_instance_types(include_arm=arm), refresh=refresh)
 
         table = Table(title=f"Spot Prices ({explicit_region})", show_header=True)
         table.add_column("Instance", style="cyan")
@@ -152,10 +155,10 @@ def prices(
         table.add_column("$/hr", justify="right", style="green")
         table.add_column("", style="bold yellow")
 
-        for itype, vcpu_count, iarch in COMPUTE_INSTANCES:
-            if not arm and iarch == "arm64":
-                continue
-            price = spot_prices.get(itype)
+        rows = [row for row in COMPUTE_INSTANCES if arm or row[2] != "arm64"]
+        get_price = spot_prices.get
+        for itype, vcpu_count, iarch in rows:
+            price = get_price(itype)
             price_str = f"${price:.4f}" if price is not None else "n/a"
             marker = "<-- selected" if itype == instance_type else ""
             table.add_row(itype, iarch, str(vcpu_count), price_str, marker)
@@ -167,29 +170,11 @@ def prices(
     else:
         # Cross-region view (auto-select cheapest)
         with console.status("Checking spot prices across regions..."):
-            for region in CANDIDATE_REGIONS:
-                try:
-                    client = EC2Manager(region=region)
-                    rp = client.get_spot_prices([instance_type])
-                    price = rp.get(instance_type)
-                    if price is not None:
-                        region_prices.append((region, price))
-                except ClientError as e:
-                    code = e.response["Error"]["Code"]
-                    if code in (
-                        "AuthFailure", "UnauthorizedOperation",
-                        "InvalidClientTokenId", "ExpiredToken",
-                    ):
-                        raise
-                    continue
-                except Exception:
-                    continue
+            region_prices = scan_region_prices(instance_type, refresh=refresh)
 
         if not region_prices:
             console.print("[yellow]No pricing data available for any region.[/yellow]")
         else:
-            region_prices.sort(key=lambda x: x[1])
-
             table = Table(
                 title=f"Spot Prices for {instance_type} ({vcpus} vCPUs)",
                 show_header=True,
@@ -219,6 +204,8 @@ def prices(
 @app.command()
 def teardown() -> None:
     """Terminate the running spot instance."""
+    from spotrun.session import Session
+
     state = Session.load_state()
     if not state:
         console.print("[yellow]No active instance found.[/yellow]")
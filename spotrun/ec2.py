@@ -2,27 +2,45 @@
 
 from __future__ import annotations
 
+import errno
+import functools
 import os
+import select
 import socket
 import stat
 import threading
 import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
-import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError
 from rich.console import Console
 
+from spotrun.cache import cache_get, cache_put
+
 
 @contextmanager
 def _nullcontext():
     """No-op context manager (Python 3.6 compat, avoids import)."""
     yield
 
+
 console = Console()
 SPOTRUN_DIR = Path.home() / ".spotrun"
 
+# DescribeImages results cached on disk (see get_ubuntu_ami / AMIManager.find_existing)
+AMI_CACHE_FILE = SPOTRUN_DIR / "ami_cache.json"
+_UBUNTU_AMI_TTL = 24 * 3600  # Canonical publishes new images at most daily
+_UBUNTU_OWNER = "099720109477"
+
+# Spot prices drift over hours, so a short-lived copy on disk lets repeated
+# `spotrun prices` / launches skip DescribeSpotPriceHistory entirely
+PRICE_CACHE_FILE = SPOTRUN_DIR / "prices.json"
+_PRICE_TTL = 15 * 60
+
 # Serialize ensure_infra across threads to prevent key pair race conditions
 _infra_lock = threading.Lock()
 
@@ -37,12 +55,59 @@ CANDIDATE_REGIONS = [
     "ap-northeast-1",
 ]
 
+# One boto3 session for the process. Building clients from it is not
+# thread-safe, so creation goes through _boto_lock; the clients themselves
+# are, and are shared per region so repeat EC2Managers reuse the HTTPS pool.
+_boto_lock = threading.Lock()
+_clients: dict[str, object] = {}
+
+
+@functools.lru_cache(maxsize=1)
+def _boto():
+    """Import boto3 and build the shared (session, config) on first use.
+
+    ``import boto3`` costs hundreds of ms, so commands that never talk to
+    AWS (``--help``, ``teardown`` with no state) don't pay for it.
+    Call with _boto_lock held.
+    """
+    import boto3
+    from botocore.config import Config
+
+    # Adaptive retries rate-limit client-side once AWS starts throttling
+    # (RequestLimitExceeded) instead of retrying into the throttle.
+    return boto3.session.Session(), Config(
+        retries={"max_attempts": 6, "mode": "adaptive"},
+        max_pool_connections=32,
+        connect_timeout=3,
+        read_timeout=15,
+    )
+
+
+def _ec2_client(region: str):
+    """Return the shared EC2 client for *region*, creating it on first use."""
+    with _boto_lock:
+        client = _clients.get(region)
+        if client is None:
+            session, config = _boto()
+            client = session.client("ec2", region_name=region, config=config)
+            _clients[region] = client
+        return client
+
+
+# Cross-region price scans are I/O-bound: one worker per region overlaps the
+# round-trips so a scan costs roughly the slowest region, not the sum.
+_region_pool = ThreadPoolExecutor(
+    max_workers=len(CANDIDATE_REGIONS), thread_name_prefix="spotrun-region",
+)
 
 _AUTH_ERROR_CODES = {
     "AuthFailure", "UnauthorizedOperation",
     "InvalidClientTokenId", "ExpiredToken",
 }
 
+# Seconds between DescribeInstances polls in wait_for_running; the last value repeats
+_RUNNING_POLL_DELAYS = (2, 2, 3, 5, 8, 13, 15)
+
 CAPACITY_ERROR_CODES = {
     "InsufficientInstanceCapacity",
     "InstanceLimitExceeded",
@@ -56,6 +121,136 @@ def is_capacity_error(error: ClientError) -> bool:
     return error.response["Error"]["Code"] in CAPACITY_ERROR_CODES
 
 
+def _ttl_cache(seconds: float):
+    """Memoize a function's results for *seconds*. Thread-safe.
+
+    List/tuple arguments are keyed as frozensets, so argument order doesn't
+    matter. Exceptions are not cached. Adds ``cache_clear()`` like lru_cache.
+    """
+    def decorator(fn):
+        cache: dict = {}
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            key = tuple(
+                frozenset(a) if isinstance(a, (list, tuple)) else a for a in args
+            )
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(key)
+            if hit is not None and hit[0] > now:
+                return hit[1]
+            value = fn(*args)
+            with lock:
+                cache[key] = (now + seconds, value)
+            return value
+
+        def cache_clear() -> None:
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+
+def _get_spot_prices(client, instance_types: Sequence[str]) -> dict[str, float]:
+    """Cheapest current spot price per instance type in *client*'s region."""
+    # One row per (instance type, AZ) comes back, which can exceed a single
+    # page for the full instance list; follow NextToken rather than truncate.
+    paginator = client.get_paginator("describe_spot_price_history")
+    pages = paginator.paginate(
+        InstanceTypes=list(instance_types),
+        ProductDescriptions=["Linux/UNIX"],
+        StartTime=datetime.now(timezone.utc),
+        PaginationConfig={"MaxItems": 500, "PageSize": 100},
+    )
+    prices: dict[str, float] = {}
+    for page in pages:
+        for entry in page["SpotPriceHistory"]:
+            itype = entry["InstanceType"]
+            price = float(entry["SpotPrice"])
+            if itype not in prices or price < prices[itype]:
+                prices[itype] = price
+    return prices
+
+
+@_ttl_cache(60)
+def _region_spot_prices(region: str, instance_types: Sequence[str]) -> dict[str, float]:
+    """Cached _get_spot_prices for *region*, using the shared per-region client.
+
+    Also persisted to PRICE_CACHE_FILE for _PRICE_TTL seconds, keyed by
+    region and the set of instance types asked for. Callers get the shared
+    dict and must copy it before mutating.
+    """
+    key = f"{region}:{','.join(sorted(instance_types))}"
+    hit = cache_get(PRICE_CACHE_FILE, key, _PRICE_TTL)
+    if hit is not None and isinstance(hit.get("prices"), dict):
+        return hit["prices"]
+    prices = _get_spot_prices(_ec2_client(region), instance_types)
+    cache_put(PRICE_CACHE_FILE, key, prices=prices)
+    return prices
+
+
+def _price_for_region(region: str, instance_type: str) -> tuple[str, float | None]:
+    """Return (region, cheapest spot price) for one region.
+
+    The price is None when the region has no data or cannot be queried.
+    Auth and credential errors are re-raised since every region would fail.
+    """
+    try:
+        prices = _region_spot_prices(region, [instance_type])
+    except ClientError as e:
+        if e.response["Error"]["Code"] in _AUTH_ERROR_CODES:
+            raise
+        return region, None
+    except NoCredentialsError:
+        raise
+    except BotoCoreError:
+        return region, None
+    return region, prices.get(instance_type)
+
+
+@_ttl_cache(60)
+def _scan_region_prices(
+    instance_type: str, regions: list[str],
+) -> tuple[tuple[str, float], ...]:
+    """Query *regions* concurrently, returning (region, price) for those with data."""
+    results = _region_pool.map(
+        _price_for_region, regions, [instance_type] * len(regions),
+    )
+    return tuple((region, price) for region, price in results if price is not None)
+
+
+def clear_price_cache() -> None:
+    """Forget spot prices cached by get_spot_prices and the region scans, on disk too."""
+    _scan_region_prices.cache_clear()
+    _region_spot_prices.cache_clear()
+    try:
+        PRICE_CACHE_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def scan_region_prices(
+    instance_type: str,
+    regions: list[str] | None = None,
+    refresh: bool = False,
+) -> list[tuple[str, float]]:
+    """Spot prices for *instance_type* across *regions*, cheapest first.
+
+    *regions* defaults to CANDIDATE_REGIONS; regions without pricing data
+    are left out. With *refresh*, cached prices are dropped first (see
+    clear_price_cache) so every region is queried again.
+    """
+    if refresh:
+        clear_price_cache()
+    if regions is None:
+        regions = CANDIDATE_REGIONS
+    return sorted(_scan_region_prices(instance_type, regions), key=lambda x: x[1])
+
+
 def find_ranked_regions(
     instance_type: str,
     exclude: list[str] | None = None,
@@ -69,40 +264,17 @@ def find_ranked_regions(
     Raises RuntimeError if no pricing data is available in any region.
     """
     exclude_set = set(exclude or [])
-    results: list[tuple[str, float]] = []
+    regions = [r for r in CANDIDATE_REGIONS if r not in exclude_set]
 
     ctx = console.status("Checking spot prices across regions...") if not quiet else _nullcontext()
     with ctx:
-        for region in CANDIDATE_REGIONS:
-            if region in exclude_set:
-                continue
-            try:
-                client = boto3.client("ec2", region_name=region)
-                resp = client.describe_spot_price_history(
-                    InstanceTypes=[instance_type],
-                    ProductDescriptions=["Linux/UNIX"],
-                    MaxResults=20,
-                )
-                best_price = float("inf")
-                for entry in resp.get("SpotPriceHistory", []):
-                    price = float(entry["SpotPrice"])
-                    if price < best_price:
-                        best_price = price
-                if best_price < float("inf"):
-                    results.append((region, best_price))
-            except ClientError as e:
-                code = e.response["Error"]["Code"]
-                if code in _AUTH_ERROR_CODES:
-                    raise
-                continue
+        results = scan_region_prices(instance_type, regions)
 
     if not results:
         raise RuntimeError(
             f"Could not find spot pricing for {instance_type} in any region."
         )
 
-    results.sort(key=lambda x: x[1])
-
     if not quiet:
         best_region, best_price = results[0]
         console.print(
@@ -121,29 +293,83 @@ def find_cheapest_region(instance_type: str) -> tuple[str, float]:
     return find_ranked_regions(instance_type)[0]
 
 
+def _probe_ssh(ip: str, timeout: float = 2.0) -> bool | None:
+    """Make one SSH readiness probe against *ip*.
+
+    Returns True once sshd has sent its ``SSH-`` banner, False if the port
+    is closed or unreachable, and None if nothing answered within *timeout*.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if hasattr(socket, "TCP_USER_TIMEOUT"):
+            # Linux: give up on a half-open connection instead of retransmitting
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, int(timeout * 1000))
+        sock.setblocking(False)
+        err = sock.connect_ex((ip, 22))
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            return False
+        _, writable, _ = select.select([], [sock], [], timeout)
+        if not writable:
+            return None
+        if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) != 0:
+            return False
+        # Port open isn't enough: wait for sshd to speak first
+        readable, _, _ = select.select([sock], [], [], timeout)
+        if not readable:
+            return None
+        return sock.recv(16).startswith(b"SSH-")
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
 class EC2Manager:
     """Manages EC2 resources: key pairs, security groups, instances."""
 
     def __init__(self, region: str | None = None) -> None:
         self.region = region or os.environ.get("AWS_REGION", "us-east-1")
-        self.client = boto3.client("ec2", region_name=self.region)
-        self.ec2 = boto3.resource("ec2", region_name=self.region)
-
-    def ensure_infra(self, project_tag: str = "spotrun") -> tuple[str, str, str]:
+        self.client = _ec2_client(self.region)
+
+    @functools.cached_property
+    def ec2(self):
+        """EC2 resource interface, built on first use (most paths only need the client)."""
+        with _boto_lock:
+            session, config = _boto()
+            return session.resource("ec2", region_name=self.region, config=config)
+
+    def ensure_infra(
+        self, project_tag: str = "spotrun", force_verify: bool = False,
+    ) -> tuple[str, str, str]:
         """Ensure key pair and security group exist.
 
         Thread-safe: uses a lock to prevent race conditions when multiple
         threads try to create the same key pair simultaneously.
 
+        A local PEM file is trusted without asking AWS; if the key pair turns
+        out to be gone, request_spot_instance recreates it with
+        ``force_verify=True``, which always checks AWS.
+
         Returns (key_name, pem_path, sg_id).
         """
         key_name = f"{project_tag}-{self.region}"
         pem_path = str(SPOTRUN_DIR / f"{key_name}.pem")
+        self._ensure_key_pair(key_name, pem_path, force_verify=force_verify)
+
+        # Security group (already idempotent, no lock needed)
+        sg_name = f"{project_tag}-ssh"
+        sg_id = self._ensure_security_group(sg_name, project_tag)
+
+        return key_name, pem_path, sg_id
 
+    def _ensure_key_pair(self, key_name: str, pem_path: str, force_verify: bool = False) -> None:
         with _infra_lock:
             SPOTRUN_DIR.mkdir(parents=True, exist_ok=True, mode=0o700)
 
-            # Key pair
+            if not force_verify and Path(pem_path).exists():
+                console.print(f"[dim]Key pair [bold]{key_name}[/bold] exists[/dim]")
+                return
+
             need_create = False
             try:
                 self.client.describe_key_pairs(KeyNames=[key_name])
@@ -166,15 +392,16 @@ class EC2Manager:
             if need_create:
                 console.print(f"Creating key pair [bold]{key_name}[/bold]")
                 resp = self.client.create_key_pair(KeyName=key_name)
+                # A stale PEM is read-only, so remove it rather than truncate
+                Path(pem_path).unlink(missing_ok=True)
                 fd = os.open(pem_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, stat.S_IRUSR)
-                with os.fdopen(fd, "w") as f:
-                    f.write(resp["KeyMaterial"])
-
-        # Security group (already idempotent, no lock needed)
-        sg_name = f"{project_tag}-ssh"
-        sg_id = self._ensure_security_group(sg_name, project_tag)
-
-        return key_name, pem_path, sg_id
+                try:
+                    os.write(fd, resp["KeyMaterial"].encode("ascii"))
+                    # On disk before _infra_lock is released and other
+                    # workers start trusting the file
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
 
     def _ensure_security_group(self, sg_name: str, project_tag: str) -> str:
         try:
@@ -222,20 +449,19 @@ class EC2Manager:
                     return resp["SecurityGroups"][0]["GroupId"]
             raise
 
-    def get_spot_prices(self, instance_types: list[str]) -> dict[str, float]:
-        """Get current spot prices, returning cheapest per instance type."""
-        resp = self.client.describe_spot_price_history(
-            InstanceTypes=instance_types,
-            ProductDescriptions=["Linux/UNIX"],
-            MaxResults=len(instance_types) * 10,
-        )
-        prices: dict[str, float] = {}
-        for entry in resp["SpotPriceHistory"]:
-            itype = entry["InstanceType"]
-            price = float(entry["SpotPrice"])
-            if itype not in prices or price < prices[itype]:
-                prices[itype] = price
-        return prices
+    def get_spot_prices(
+        self, instance_types: Sequence[str], refresh: bool = False,
+    ) -> dict[str, float]:
+        """Get current spot prices, returning cheapest per instance type.
+
+        ``StartTime=now`` makes AWS return only the price in effect right now
+        for each (instance type, AZ) instead of a window of recent history.
+        Results are cached in-process for 60s and on disk for 15 minutes;
+        *refresh* drops those caches first (see clear_price_cache).
+        """
+        if refresh:
+            clear_price_cache()
+        return dict(_region_spot_prices(self.region, instance_types))
 
     def request_spot_instance(
         self,
@@ -283,22 +509,51 @@ class EC2Manager:
                 "CoreCount": core_count,
                 "ThreadsPerCore": threads_per_core,
             }
-        resp = self.client.run_instances(**kwargs)
+        try:
+            resp = self.client.run_instances(**kwargs)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "InvalidKeyPair.NotFound":
+                raise
+            # The local PEM outlived its AWS key pair: recreate and retry once
+            console.print(f"[yellow]Key pair [bold]{key_name}[/bold] missing in AWS. Recreating...[/yellow]")
+            pem_path = str(SPOTRUN_DIR / f"{key_name}.pem")
+            self._ensure_key_pair(key_name, pem_path, force_verify=True)
+            resp = self.client.run_instances(**kwargs)
         instance_id = resp["Instances"][0]["InstanceId"]
         return instance_id
 
     def wait_for_running(self, instance_id: str, timeout: int = 300) -> str:
-        """Wait until the instance is running, then return its public IP."""
-        waiter = self.client.get_waiter("instance_running")
-        waiter.wait(
-            InstanceIds=[instance_id],
-            WaiterConfig={"Delay": 5, "MaxAttempts": timeout // 5},
-        )
-        resp = self.client.describe_instances(InstanceIds=[instance_id])
-        ip = resp["Reservations"][0]["Instances"][0].get("PublicIpAddress")
-        if not ip:
-            raise RuntimeError(f"Instance {instance_id} has no public IP")
-        return ip
+        """Wait until the instance is running, then return its public IP.
+
+        Polls DescribeInstances on a short-then-backing-off schedule
+        (see _RUNNING_POLL_DELAYS) rather than the waiter's fixed interval,
+        since most instances reach ``running`` within 10-30s.
+        """
+        deadline = time.time() + timeout
+        delays = iter(_RUNNING_POLL_DELAYS)
+        while True:
+            try:
+                resp = self.client.describe_instances(InstanceIds=[instance_id])
+            except ClientError as e:
+                # Eventual consistency: a just-launched id may not be visible yet
+                if e.response["Error"]["Code"] != "InvalidInstanceID.NotFound":
+                    raise
+            else:
+                instance = resp["Reservations"][0]["Instances"][0]
+                state = instance["State"]["Name"]
+                if state == "running":
+                    ip = instance.get("PublicIpAddress")
+                    if not ip:
+                        raise RuntimeError(f"Instance {instance_id} has no public IP")
+                    return ip
+                if state in ("shutting-down", "terminated", "stopping", "stopped"):
+                    reason = instance.get("StateReason", {}).get("Message", state)
+                    raise RuntimeError(f"Instance {instance_id} entered state {state}: {reason}")
+
+            delay = next(delays, _RUNNING_POLL_DELAYS[-1])
+            if time.time() + delay > deadline:
+                raise TimeoutError(f"Instance {instance_id} not running after {timeout}s")
+            time.sleep(delay)
 
     def terminate_instance(self, instance_id: str) -> None:
         """Terminate an EC2 instance."""
@@ -306,15 +561,22 @@ class EC2Manager:
         console.print(f"Terminated instance [bold]{instance_id}[/bold]")
 
     def wait_for_ssh(self, ip: str, timeout: int = 300) -> None:
-        """Poll port 22 until SSH is accepting connections."""
+        """Poll port 22 until sshd answers with its protocol banner.
+
+        Refused connections back off exponentially (1s, growing to 8s);
+        probes that simply went unanswered retry immediately since they
+        already waited.
+        """
         deadline = time.time() + timeout
+        delay = 1.0
         while time.time() < deadline:
-            try:
-                sock = socket.create_connection((ip, 22), timeout=5)
-                sock.close()
+            ready = _probe_ssh(ip)
+            if ready:
                 return
-            except (OSError, ConnectionRefusedError):
-                time.sleep(5)
+            if ready is None:
+                continue
+            time.sleep(delay)
+            delay = min(delay * 1.5, 8.0)
         raise TimeoutError(f"SSH not available on {ip} after {timeout}s")
 
     def get_ubuntu_ami(self, arch: str = "x86_64") -> str:
@@ -328,15 +590,22 @@ class EC2Manager:
             if arch == "arm64"
             else "ubuntu/images/hvm-ssd-gp3/ubuntu-noble-24.04-amd64-server-*"
         )
+        cache_key = "|".join(("ubuntu", self.region, arch, _UBUNTU_OWNER, name_pattern))
+        cached = cache_get(AMI_CACHE_FILE, cache_key, _UBUNTU_AMI_TTL)
+        if cached:
+            return cached["ami_id"]
+
         resp = self.client.describe_images(
-            Owners=["099720109477"],
+            Owners=[_UBUNTU_OWNER],
             Filters=[
                 {"Name": "name", "Values": [name_pattern]},
                 {"Name": "architecture", "Values": [arch]},
                 {"Name": "state", "Values": ["available"]},
             ],
         )
-        images = sorted(resp["Images"], key=lambda i: i["CreationDate"], reverse=True)
+        images = resp["Images"]
         if not images:
             raise RuntimeError(f"No Ubuntu 24.04 ({arch}) AMI found in {self.region}")
-        return images[0]["ImageId"]
+        ami_id = max(images, key=lambda i: i["CreationDate"])["ImageId"]
+        cache_put(AMI_CACHE_FILE, cache_key, ami_id=ami_id)
+        return ami_id
@@ -1,5 +1,6 @@
 """Instance selection and cost estimation."""
 
+import functools
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -27,6 +28,16 @@ COMPUTE_INSTANCES: list[tuple[str, int, str]] = [
     ("c6a.16xlarge",  64, "x86_64"),
 ]
 
+# instance_type -> (vcpus, arch), in COMPUTE_INSTANCES order
+_INSTANCE_INDEX: dict[str, tuple[int, str]] = {
+    it: (vc, arch) for it, vc, arch in COMPUTE_INSTANCES
+}
+
+_NO_PRICED_CANDIDATES = (
+    "Spot prices provided but no candidates have pricing data; "
+    "falling back to vCPU-sorted selection"
+)
+
 MAX_WORKERS_X86 = (64 - 1) // 2  # 31 (x86: 2 vCPUs per physical core)
 MAX_WORKERS_ARM = 64 - 1          # 63 (ARM/Graviton: 1 vCPU = 1 physical core)
 
@@ -43,20 +54,12 @@ def _vcpus_needed(workers: int, arch: str) -> int:
     return workers * 2 + 1
 
 
-def select_ranked_instances(
-    workers: int,
-    prices: dict[str, float] | None = None,
-    include_arm: bool = False,
-) -> list[tuple[str, int]]:
-    """Return all candidate instances ranked by price (cheapest first).
+@functools.lru_cache(maxsize=64)
+def _candidates_by_vcpu(workers: int, include_arm: bool) -> tuple[tuple[str, int], ...]:
+    """Instances with enough vCPUs for *workers*, smallest first.
 
-    Args:
-        workers: Number of parallel workers needed.
-        prices: Optional dict of instance_type -> spot_price. When provided,
-            sorts candidates by price. Without prices, sorts by vCPU count.
-        include_arm: If True, include ARM/Graviton instances.
-
-    Returns list of (instance_type, vcpus).
+    A pure function of two small arguments, so it is cached. Raises
+    ValueError for unsupported worker counts (errors are not cached).
     """
     if workers < 1:
         raise ValueError(f"workers must be >= 1, got {workers}")
@@ -72,20 +75,36 @@ def select_ranked_instances(
     ]
     if not candidates:
         raise ValueError(f"No instance with enough vCPUs for {workers} workers.")
+    candidates.sort(key=lambda x: x[1])
+    return tuple(candidates)
+
+
+def select_ranked_instances(
+    workers: int,
+    prices: dict[str, float] | None = None,
+    include_arm: bool = False,
+) -> list[tuple[str, int]]:
+    """Return all candidate instances ranked by price (cheapest first).
+
+    Args:
+        workers: Number of parallel workers needed.
+        prices: Optional dict of instance_type -> spot_price. When provided,
+            sorts candidates by price. Without prices, sorts by vCPU count.
+        include_arm: If True, include ARM/Graviton instances.
+
+    Returns list of (instance_type, vcpus).
+    """
+    candidates = _candidates_by_vcpu(workers, include_arm)
 
     if prices:
         priced = [(it, vc, prices[it]) for it, vc in candidates if it in prices]
         if priced:
             priced.sort(key=lambda x: x[2])
             return [(it, vc) for it, vc, _ in priced]
-        _logger.warning(
-            "Spot prices provided but no candidates have pricing data; "
-            "falling back to vCPU-sorted selection"
-        )
+        _logger.warning(_NO_PRICED_CANDIDATES)
 
     # Without prices, sort by vCPU count (smallest first)
-    candidates.sort(key=lambda x: x[1])
-    return candidates
+    return list(candidates)
 
 
 def select_instance(
@@ -105,15 +124,27 @@ def select_instance(
 
     Returns (instance_type, vcpus).
     """
-    ranked = select_ranked_instances(workers, prices=prices, include_arm=include_arm)
-    return ranked[0]
+    candidates = _candidates_by_vcpu(workers, include_arm)
+    if prices:
+        # Only the cheapest is needed: one pass, no priced list or sort.
+        # Strict < keeps the smallest instance on ties, like the stable sort.
+        best: tuple[str, int] | None = None
+        best_price = 0.0
+        for it, vc in candidates:
+            price = prices.get(it)
+            if price is not None and (best is None or price < best_price):
+                best, best_price = (it, vc), price
+        if best is not None:
+            return best
+        _logger.warning(_NO_PRICED_CANDIDATES)
+    return candidates[0]
 
 
 def instance_arch(instance_type: str) -> str:
     """Return the architecture for an instance type."""
-    for it, _, arch in COMPUTE_INSTANCES:
-        if it == instance_type:
-            return arch
+    entry = _INSTANCE_INDEX.get(instance_type)
+    if entry is not None:
+        return entry[1]
     if any(fam in instance_type for fam in ("c6g", "c7g", "c8g", "m6g", "m7g")):
         return "arm64"
     return "x86_64"
@@ -124,9 +155,10 @@ def estimate_cost(spot_price_per_hour: float, minutes: float) -> float:
     return spot_price_per_hour * (minutes / 60.0)
 
 
-def all_instance_types(include_arm: bool = False) -> list[str]:
-    """Return instance type names for pricing queries."""
-    return [
+@functools.lru_cache(maxsize=2)
+def all_instance_types(include_arm: bool = False) -> tuple[str, ...]:
+    """Return instance type names for pricing queries (cached, immutable)."""
+    return tuple(
         itype for itype, _, arch in COMPUTE_INSTANCES
         if include_arm or arch == "x86_64"
-    ]
+    )
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Install a project's Python dependencies into its venv.
+
+Baked into spotrun AMIs as /usr/local/bin/spotrun-install-deps and run as
+``spotrun-install-deps <project root>``. Uses requirements.txt if present,
+else [project].dependencies from pyproject.toml. The last output line is
+STATUS=installed:<file>, STATUS=failed:<file>, STATUS=no_venv or STATUS=none.
+"""
+
+import os
+import subprocess
+import sys
+import tomllib
+
+
+def main(root: str) -> str:
+    venv_bin = os.path.join(root, ".venv", "bin")
+    if not os.path.isdir(venv_bin):
+        return "no_venv"
+    pip = [os.path.join(venv_bin, "python"), "-m", "pip", "install", "--quiet"]
+
+    requirements = os.path.join(root, "requirements.txt")
+    if os.path.isfile(requirements):
+        rc = subprocess.call(pip + ["-r", requirements], stderr=subprocess.STDOUT)
+        return ("installed" if rc == 0 else "failed") + ":requirements.txt"
+
+    pyproject = os.path.join(root, "pyproject.toml")
+    if os.path.isfile(pyproject):
+        try:
+            with open(pyproject, "rb") as f:
+                deps = tomllib.load(f).get("project", {}).get("dependencies", [])
+        except (OSError, tomllib.TOMLDecodeError) as e:
+            print(f"Could not read {pyproject}: {e}", flush=True)
+            return "failed:pyproject.toml"
+        rc = subprocess.call(pip + deps, stderr=subprocess.STDOUT) if deps else 0
+        return ("installed" if rc == 0 else "failed") + ":pyproject.toml"
+
+    return "none"
+
+
+if __name__ == "__main__":
+    print(f"STATUS={main(sys.argv[1] if len(sys.argv) > 1 else '/opt/project')}")
@@ -2,18 +2,24 @@
 
 from __future__ import annotations
 
+import functools
+import heapq
 import json
 import os
+import shlex
 import stat
 import subprocess
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 from botocore.exceptions import ClientError
 from rich.console import Console
+from rich.markup import escape
 from rich.panel import Panel
 from rich.table import Table
 
-from spotrun.ami import AMIManager
+from spotrun.ami import INSTALL_DEPS_BIN, AMIManager
 from spotrun.ec2 import (
     _AUTH_ERROR_CODES,
     CANDIDATE_REGIONS,
@@ -23,16 +29,84 @@ from spotrun.ec2 import (
 )
 from spotrun.exceptions import SpotCapacityError
 from spotrun.pricing import (
+    _INSTANCE_INDEX,
     all_instance_types,
     instance_arch,
     select_instance,
     select_ranked_instances,
 )
-from spotrun.sync import DataSync
+from spotrun.sync import DataSync, _ensure_state_dir
 
 console = Console()
 STATE_FILE = Path.home() / ".spotrun" / "state.json"
 
+# Detects the deps file and installs it into the project venv in a single SSH
+# session. Expects $R (remote project root) to be set; the last output line is
+# STATUS=installed:<file>, STATUS=failed:<file>, STATUS=no_venv or STATUS=none.
+# AMIs built by AMIManager carry the same logic as a stdlib-only helper
+# (scripts/install_deps.py); the inline version covers older AMIs.
+_INSTALL_DEPS_SCRIPT = f'[ -x {INSTALL_DEPS_BIN} ] && exec {INSTALL_DEPS_BIN} "$R"\n' + """\
+if [ ! -d "$R/.venv/bin" ]; then
+    echo STATUS=no_venv
+elif [ -f "$R/requirements.txt" ]; then
+    if "$R/.venv/bin/pip" install --quiet -r "$R/requirements.txt" 2>&1; then
+        echo STATUS=installed:requirements.txt
+    else
+        echo STATUS=failed:requirements.txt
+    fi
+elif [ -f "$R/pyproject.toml" ]; then
+    if "$R/.venv/bin/python" - "$R/pyproject.toml" 2>&1 << 'PYEOF'
+import subprocess, sys
+try:
+    import tomllib
+except ImportError:
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "--quiet", "tomli"])
+    import tomli as tomllib
+with open(sys.argv[1], "rb") as f:
+    deps = tomllib.load(f).get("project", {}).get("dependencies", [])
+if deps:
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "--quiet"] + deps)
+PYEOF
+    then
+        echo STATUS=installed:pyproject.toml
+    else
+        echo STATUS=failed:pyproject.toml
+    fi
+else
+    echo STATUS=none
+fi
+"""
+
+# run_instances errors meaning the (possibly cached) AMI id no longer exists
+_STALE_AMI_CODES = {"InvalidAMIID.NotFound", "InvalidAMIID.Unavailable"}
+
+
+@functools.lru_cache(maxsize=8)
+def _venv_prefix(remote_root: str) -> str:
+    """Shell prefix that activates the project venv under *remote_root* if it exists."""
+    activate = f"{remote_root}/.venv/bin/activate"
+    return f"if [ -f {activate} ]; then source {activate}; fi && "
+
+
+# Instance types in pricing-table order (smallest first), with their vCPUs
+_DISPLAY_ORDER = tuple((it, vc) for it, (vc, _) in _INSTANCE_INDEX.items())
+
+
+@functools.lru_cache(maxsize=16)
+def _pricing_table(prices: frozenset, instance_type: str) -> Table:
+    """Build the spot price table, reused when a fallback shows the same prices again."""
+    all_prices = dict(prices)
+    table = Table(title="Spot Prices", show_header=True)
+    table.add_column("Instance", style="cyan")
+    table.add_column("vCPUs", justify="right")
+    table.add_column("$/hr", justify="right", style="green")
+    for itype, vcpu_count in _DISPLAY_ORDER:
+        if itype not in all_prices:
+            continue
+        marker = " <--" if itype == instance_type else ""
+        table.add_row(itype, str(vcpu_count), f"${all_prices[itype]:.4f}" + marker)
+    return table
+
 
 class Session:
     """Orchestrates the full lifecycle: launch, sync, run, teardown."""
@@ -53,6 +127,7 @@ class Session:
         self.workers = workers
         self.project_tag = project_tag
         self._save_state_enabled = save_state
+        self._last_state_json: str | None = None
         self.bootstrap_script = bootstrap_script
         self.requirements_file = requirements_file
         self.include_arm = include_arm
@@ -76,6 +151,7 @@ class Session:
             region, _ = find_cheapest_region(it)
 
         self.ec2 = EC2Manager(region=region)
+        self._ec2_by_region: dict[str, EC2Manager] = {self.ec2.region: self.ec2}
         self.ami_mgr = AMIManager(self.ec2)
         self._sync: DataSync | None = None
         self._instance_id: str | None = None
@@ -173,30 +249,39 @@ class Session:
         if self._region_explicit:
             regions = [self.ec2.region]
         else:
-            regions = [self.ec2.region]
-            for r in CANDIDATE_REGIONS:
-                if r not in regions:
-                    regions.append(r)
+            # Current region first, then the rest in order, without duplicates
+            regions = list(dict.fromkeys([self.ec2.region, *CANDIDATE_REGIONS]))
 
         # Fetch prices from all regions and build globally ranked list
-        # Each entry: (price, region, instance_type, vcpus)
-        global_candidates: list[tuple[float, str, str, int]] = []
+        # Each entry: (price, seq, region, instance_type, vcpus); seq breaks
+        # price ties in discovery order
+        global_candidates: list[tuple[float, int, str, str, int]] = []
         region_prices: dict[str, dict[str, float]] = {}
 
         if len(regions) > 1:
             self._print("[dim]Querying spot prices across regions...[/dim]")
 
+        # Price lookups are independent network round-trips: overlap them
+        with ThreadPoolExecutor(max_workers=len(regions)) as pool:
+            futures = {
+                pool.submit(self._manager_for(r).get_spot_prices, all_itypes): r
+                for r in regions
+            }
+            for future in as_completed(futures):
+                region = futures[future]
+                try:
+                    region_prices[region] = future.result()
+                except ClientError as e:
+                    if e.response["Error"]["Code"] in _AUTH_ERROR_CODES:
+                        raise
+                    self.fallback_log.append(f"Could not query prices in {region}")
+
+        # Walk regions in their original order so equal prices rank the same
+        # way regardless of which response arrived first
         for region in regions:
-            try:
-                mgr = self.ec2 if region == self.ec2.region else EC2Manager(region=region)
-                prices = mgr.get_spot_prices(all_itypes)
-            except ClientError as e:
-                if e.response["Error"]["Code"] in _AUTH_ERROR_CODES:
-                    raise
-                self.fallback_log.append(f"Could not query prices in {region}")
+            prices = region_prices.get(region)
+            if prices is None:
                 continue
-
-            region_prices[region] = prices
             try:
                 ranked = select_ranked_instances(
                     self.workers, prices=prices, include_arm=self.include_arm,
@@ -207,7 +292,9 @@ class Session:
             for itype, vcpus in ranked:
                 price = prices.get(itype)
                 if price is not None:
-                    global_candidates.append((price, region, itype, vcpus))
+                    global_candidates.append(
+                        (price, len(global_candidates), region, itype, vcpus)
+                    )
 
         if not global_candidates:
             raise SpotCapacityError(
@@ -215,19 +302,21 @@ class Session:
                 attempts=[],
             )
 
-        # Sort by price — globally cheapest first
-        global_candidates.sort(key=lambda x: x[0])
+        # Min-heap by price: usually only the first few candidates are tried,
+        # so pop them lazily instead of fully sorting
+        heapq.heapify(global_candidates)
 
         # Show pricing table for the cheapest candidate's region
         if not self._quiet:
-            price0, region0, itype0, vcpus0 = global_candidates[0]
+            price0, _, region0, itype0, vcpus0 = global_candidates[0]
             best_prices = region_prices.get(region0, {})
             self._show_pricing(itype0, vcpus0, price0, best_prices)
 
         # Lazy infra setup per region
         region_infra: dict[str, tuple[str, str, str]] = {}
 
-        for i, (price, region, itype, vcpus) in enumerate(global_candidates):
+        for i in range(len(global_candidates)):
+            price, _, region, itype, vcpus = heapq.heappop(global_candidates)
             # Switch region if needed
             if region != self.ec2.region:
                 self._switch_region(region)
@@ -291,20 +380,6 @@ class Session:
 
         Raises ClientError on capacity issues (caller handles fallback).
         """
-        # Find or create AMI (must match selected architecture)
-        ami_id = self.ami_mgr.find_existing(self.project_tag, arch=arch)
-        if ami_id:
-            self._print(f"Using existing AMI: [bold]{ami_id}[/bold] ({arch})")
-        else:
-            self._print(f"No existing AMI found for {arch}, building one...")
-            ami_id = self.ami_mgr.create(
-                key_name, pem_path, sg_id,
-                bootstrap_script=bootstrap_script,
-                requirements_file=requirements_file,
-                project_tag=self.project_tag,
-                arch=arch,
-            )
-
         # CPU options: disable hyperthreading for x86
         if self.no_hyperthreading and arch != "arm64":
             threads_per_core = 1
@@ -313,28 +388,33 @@ class Session:
             threads_per_core = None
             core_count = None
 
-        if self._quiet:
-            self._instance_id = self.ec2.request_spot_instance(
-                instance_type=itype,
-                ami_id=ami_id,
-                key_name=key_name,
-                sg_id=sg_id,
-                project_tag=self.project_tag,
-                threads_per_core=threads_per_core,
-                core_count=core_count,
+        # The idle watchdog ships as user data, so it runs from first boot
+        # even if the instance never becomes reachable over SSH
+        user_data = (
+            self._idle_watchdog_user_data(idle_timeout)
+            if idle_timeout and idle_timeout > 0 else ""
+        )
+
+        ami_id = self._find_or_build_ami(
+            arch, key_name, pem_path, sg_id, bootstrap_script, requirements_file,
+        )
+        try:
+            self._request_instance(
+                itype, ami_id, key_name, sg_id, threads_per_core, core_count,
+                user_data,
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in _STALE_AMI_CODES:
+                raise
+            # The cached AMI was deregistered since we last looked it up
+            self.ami_mgr.forget(self.project_tag, arch)
+            ami_id = self._find_or_build_ami(
+                arch, key_name, pem_path, sg_id, bootstrap_script, requirements_file,
+            )
+            self._request_instance(
+                itype, ami_id, key_name, sg_id, threads_per_core, core_count,
+                user_data,
             )
-        else:
-            with console.status(f"Requesting [bold]{itype}[/bold] spot instance..."):
-                self._instance_id = self.ec2.request_spot_instance(
-                    instance_type=itype,
-                    ami_id=ami_id,
-                    key_name=key_name,
-                    sg_id=sg_id,
-                    project_tag=self.project_tag,
-                    threads_per_core=threads_per_core,
-                    core_count=core_count,
-                )
-                console.print(f"Instance: [bold]{self._instance_id}[/bold]")
 
         # Save state early
         self._save_state(key_name, sg_id)
@@ -363,9 +443,6 @@ class Session:
         self._sync = DataSync(self._ip, pem_path)
         self._save_state(key_name, sg_id)
 
-        if idle_timeout and idle_timeout > 0:
-            self._install_idle_watchdog(idle_timeout)
-
         # Store launch metadata
         self.instance_type = itype
         self.vcpus = vcpus
@@ -374,9 +451,75 @@ class Session:
         self._print("[green bold]Instance ready.[/green bold]")
         return self._ip
 
+    def _find_or_build_ami(
+        self,
+        arch: str,
+        key_name: str,
+        pem_path: str,
+        sg_id: str,
+        bootstrap_script: str | None,
+        requirements_file: str | None,
+    ) -> str:
+        """Find or create an AMI (must match the selected architecture)."""
+        ami_id = self.ami_mgr.find_existing(self.project_tag, arch=arch)
+        if ami_id:
+            self._print(f"Using existing AMI: [bold]{ami_id}[/bold] ({arch})")
+            return ami_id
+        self._print(f"No existing AMI found for {arch}, building one...")
+        return self.ami_mgr.create(
+            key_name, pem_path, sg_id,
+            bootstrap_script=bootstrap_script,
+            requirements_file=requirements_file,
+            project_tag=self.project_tag,
+            arch=arch,
+        )
+
+    def _request_instance(
+        self,
+        itype: str,
+        ami_id: str,
+        key_name: str,
+        sg_id: str,
+        threads_per_core: int | None,
+        core_count: int | None,
+        user_data: str = "",
+    ) -> None:
+        """Request the spot instance and record its id on the session."""
+        if self._quiet:
+            self._instance_id = self.ec2.request_spot_instance(
+                instance_type=itype,
+                ami_id=ami_id,
+                key_name=key_name,
+                sg_id=sg_id,
+                user_data=user_data,
+                project_tag=self.project_tag,
+                threads_per_core=threads_per_core,
+                core_count=core_count,
+            )
+        else:
+            with console.status(f"Requesting [bold]{itype}[/bold] spot instance..."):
+                self._instance_id = self.ec2.request_spot_instance(
+                    instance_type=itype,
+                    ami_id=ami_id,
+                    key_name=key_name,
+                    sg_id=sg_id,
+                    user_data=user_data,
+                    project_tag=self.project_tag,
+                    threads_per_core=threads_per_core,
+                    core_count=core_count,
+                )
+                console.print(f"Instance: [bold]{self._instance_id}[/bold]")
+
+    def _manager_for(self, region: str) -> EC2Manager:
+        """Return this session's EC2Manager for *region*, creating it once."""
+        mgr = self._ec2_by_region.get(region)
+        if mgr is None:
+            mgr = self._ec2_by_region[region] = EC2Manager(region=region)
+        return mgr
+
     def _switch_region(self, region: str) -> None:
         """Switch to a different AWS region."""
-        self.ec2 = EC2Manager(region=region)
+        self.ec2 = self._manager_for(region)
         self.ami_mgr = AMIManager(self.ec2)
         self._instance_id = None
         self._ip = None
@@ -418,64 +561,36 @@ class Session:
         if not self._sync:
             raise RuntimeError("No active session. Call launch() first.")
 
-        # Guard: skip if no venv exists (e.g. custom bootstrap that skipped it)
-        venv_check = self._sync.ssh_run(
-            f"test -d {remote_root}/.venv/bin", quiet=True,
-        )
-        if venv_check != 0:
-            return False
-
-        # Detect which deps file exists (single SSH round-trip)
-        detect_cmd = (
-            f"test -f {remote_root}/requirements.txt && echo requirements "
-            f"|| (test -f {remote_root}/pyproject.toml && echo pyproject "
-            f"|| echo none)"
+        script = f"R={shlex.quote(remote_root)}\n{_INSTALL_DEPS_SCRIPT}"
+        status_ctx = (
+            console.status("Installing Python dependencies...")
+            if not self._quiet else nullcontext()
         )
         try:
-            result = self._sync.ssh_run(detect_cmd, capture=True)
+            with status_ctx:
+                result = self._sync.ssh_run(script, capture=True)
         except subprocess.CalledProcessError:
             self._print("[yellow]Warning: could not detect dependency files[/yellow]")
             return False
         if not isinstance(result, str):
             return False
-        deps_type = result.strip()
 
-        if deps_type == "none":
-            return False
+        lines = result.rstrip("\n").splitlines()
+        status = lines.pop() if lines and lines[-1].startswith("STATUS=") else ""
+        outcome, _, source = status.removeprefix("STATUS=").partition(":")
 
-        venv_pip = f"{remote_root}/.venv/bin/pip"
-        venv_python = f"{remote_root}/.venv/bin/python"
-
-        if deps_type == "requirements":
-            self._print("[dim]Installing dependencies from requirements.txt...[/dim]")
-            install_cmd = f"{venv_pip} install --quiet -r {remote_root}/requirements.txt"
-        elif deps_type == "pyproject":
-            self._print("[dim]Installing dependencies from pyproject.toml...[/dim]")
-            install_cmd = (
-                f"{venv_python} << 'PYEOF'\n"
-                "import subprocess, sys\n"
-                "try:\n"
-                "    import tomllib\n"
-                "except ImportError:\n"
-                '    subprocess.check_call([sys.executable, "-m", "pip", "install", "--quiet", "tomli"])\n'
-                "    import tomli as tomllib\n"
-                f'with open("{remote_root}/pyproject.toml", "rb") as f:\n'
-                '    deps = tomllib.load(f).get("project", {}).get("dependencies", [])\n'
-                "if deps:\n"
-                '    subprocess.check_call([sys.executable, "-m", "pip", "install", "--quiet"] + deps)\n'
-                '    print(f"Installed {len(deps)} dependencies from pyproject.toml")\n'
-                "else:\n"
-                '    print("No dependencies found in pyproject.toml")\n'
-                "PYEOF"
+        if outcome == "installed":
+            self._print(f"[dim]Installed dependencies from {source}[/dim]")
+        elif outcome == "failed":
+            self._print(
+                f"[yellow]Warning: dependency installation from {source} "
+                f"returned non-zero exit code[/yellow]"
             )
+            if lines:
+                self._print("[dim]" + escape("\n".join(lines[-20:])) + "[/dim]")
         else:
+            # No venv (e.g. custom bootstrap that skipped it) or no deps file
             return False
-
-        exit_code = self._sync.ssh_run(install_cmd)
-        if not isinstance(exit_code, int):
-            exit_code = -1
-        if exit_code != 0:
-            self._print("[yellow]Warning: dependency installation returned non-zero exit code[/yellow]")
         return True
 
     def run(self, command: str, quiet: bool = False, stop_event=None,
@@ -497,11 +612,7 @@ class Session:
         if not self._sync:
             raise RuntimeError("No active session. Call launch() first.")
         if activate_venv:
-            activate = f"{remote_root}/.venv/bin/activate"
-            command = (
-                f"if [ -f {activate} ]; then source {activate}; fi && "
-                f"({command})"
-            )
+            command = _venv_prefix(remote_root) + "(" + command + ")"
         result = self._sync.ssh_run(
             command, quiet=quiet, stop_event=stop_event, tail_lines=tail_lines,
         )
@@ -521,6 +632,8 @@ class Session:
         """Terminate the instance and clean up state."""
         if self._instance_id:
             self.ec2.terminate_instance(self._instance_id)
+            if self._sync:
+                self._sync.close()
             self._instance_id = None
             self._ip = None
             self._sync = None
@@ -565,19 +678,28 @@ class Session:
     last *idle_timeout* seconds.
     """
 
-    def _install_idle_watchdog(self, timeout_seconds: int) -> None:
-        """Install a background watchdog that shuts down the instance after
-        *timeout_seconds* of inactivity.
+    WATCHDOG_BOOT_GRACE = 300
+    """Minimum seconds after boot before the idle watchdog's first check."""
+
+    def _idle_watchdog_user_data(self, timeout_seconds: int) -> str:
+        """Build instance user data that starts a watchdog which shuts the
+        instance down after *timeout_seconds* of inactivity.
 
         Inactivity is defined as: no active SSH connections **and** no recent
         heartbeat file update.  Either signal alone keeps the instance alive.
+        The first check waits at least WATCHDOG_BOOT_GRACE seconds so boot
+        and SSH setup can finish.
 
         Remote processes can keep the instance alive by periodically touching
         ``/tmp/spotrun-heartbeat`` (see :attr:`Session.HEARTBEAT_FILE`).
         """
-        self.run(
-            "nohup bash -c '"
+        # Extra wait so the first check is no earlier than the boot grace
+        boot_wait = max(self.WATCHDOG_BOOT_GRACE - timeout_seconds, 0)
+        return (
+            "#!/bin/bash\n"
+            "nohup setsid bash -c '"
             f"HB={self.HEARTBEAT_FILE}; "
+            f"sleep {boot_wait}; "
             f"while true; do sleep {timeout_seconds}; "
             # Active SSH connection? Stay alive.
             'pgrep -af "sshd:.*@" > /dev/null && continue; '
@@ -587,11 +709,9 @@ class Session:
             f'[ "$age" -lt {timeout_seconds} ] && continue; '
             "fi; "
             # No SSH and no recent heartbeat — shut down.
-            "sudo shutdown -h now; "
+            "shutdown -h now; "
             "done"
-            "' >/dev/null 2>&1 &",
-            quiet=True,
-            activate_venv=False,
+            "' >/dev/null 2>&1 < /dev/null &\n"
         )
 
     def _show_pricing(
@@ -603,19 +723,7 @@ class Session:
     ) -> None:
         if self._quiet:
             return
-        table = Table(title="Spot Prices", show_header=True)
-        table.add_column("Instance", style="cyan")
-        table.add_column("vCPUs", justify="right")
-        table.add_column("$/hr", justify="right", style="green")
-        from spotrun.pricing import COMPUTE_INSTANCES
-        for itype, vcpu_count, arch in COMPUTE_INSTANCES:
-            if itype not in all_prices:
-                continue
-            price = all_prices[itype]
-            price_str = f"${price:.4f}"
-            marker = " <--" if itype == instance_type else ""
-            table.add_row(itype, str(vcpu_count), price_str + marker)
-        console.print(table)
+        console.print(_pricing_table(frozenset(all_prices.items()), instance_type))
         if spot_price is not None and spot_price > 0:
             console.print(
                 Panel(
@@ -628,7 +736,7 @@ class Session:
     def _save_state(self, key_name: str, sg_id: str) -> None:
         if not self._save_state_enabled:
             return
-        STATE_FILE.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        _ensure_state_dir()
         state = {
             "instance_id": self._instance_id,
             "ip": self._ip,
@@ -637,19 +745,31 @@ class Session:
             "key_name": key_name,
             "sg_id": sg_id,
         }
-        content = json.dumps(state, indent=2)
+        content = json.dumps(state, separators=(",", ":"))
+        if content == self._last_state_json:
+            return
+        # Write beside the real file and rename over it so a crash mid-write
+        # never leaves a truncated state file behind.
+        tmp = STATE_FILE.with_suffix(".json.tmp")
         fd = os.open(
-            str(STATE_FILE),
+            str(tmp),
             os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
             stat.S_IRUSR | stat.S_IWUSR,
         )
-        with os.fdopen(fd, "w") as f:
-            f.write(content)
+        try:
+            os.write(fd, content.encode())
+            # On disk before the rename, or a crash could leave an empty file
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, STATE_FILE)
+        self._last_state_json = content
 
     def _clear_state(self) -> None:
         if not self._save_state_enabled:
             return
         Session.clear_state_file()
+        self._last_state_json = None
 
     @staticmethod
     def clear_state_file() -> None:
@@ -3,10 +3,16 @@
 from __future__ import annotations
 
 import fnmatch
+import functools
 import os
 import re
 import shlex
+import shutil
 import subprocess
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from rich.console import Console
@@ -23,34 +29,123 @@ console = Console()
 DEFAULT_EXCLUDES = (".venv", "__pycache__", ".git", "*.pyc")
 
 _KNOWN_HOSTS = str(Path.home() / ".spotrun" / "known_hosts")
+# Sockets for ssh connection sharing: the first ssh/rsync/scp to a host
+# opens a master connection and later ones reuse it without a new handshake
+_CONTROL_DIR = Path.home() / ".spotrun" / "cm"
+
+# ssh options shared by every host, and their shell-quoted form for rsync -e
+_SSH_COMMON_OPTS = (
+    "-o", "StrictHostKeyChecking=accept-new",
+    "-o", f"UserKnownHostsFile={_KNOWN_HOSTS}",
+    "-o", "ServerAliveInterval=15",
+    "-o", "ServerAliveCountMax=3",
+    "-o", "ControlMaster=auto",
+    "-o", f"ControlPath={_CONTROL_DIR}/%r@%h:%p",
+    "-o", "ControlPersist=60s",
+)
+_SSH_COMMON_OPTS_STR = " ".join(shlex.quote(opt) for opt in _SSH_COMMON_OPTS)
+
+# Projects bigger than this are sent as several parallel rsync streams (all
+# sharing the ControlMaster connection) since one rsync is CPU-bound on compression
+_SHARD_MIN_BYTES = 64 * 1024 * 1024
+_SHARD_COUNT = 4
 
 # rsync --info=progress2 emits lines like:
 #   1,234,567  45%   12.34MB/s    0:01:23 (xfr#10, to-chk=90/200)
-_PROGRESS2_RE = re.compile(
-    r"[\s,]*([\d,]+)\s+(\d+)%\s+(\S+)\s+(\S+)",
-)
+_NUMBER_BYTES = frozenset(b"0123456789,")
+
+
+def _parse_progress2(line: bytes) -> int | None:
+    """Return the bytes-transferred count from a progress2 line, else None.
+
+    A plain scan over the raw bytes instead of a regex: this runs for every
+    update rsync prints, and only ASCII digits, commas and "%" matter.
+    """
+    s = line.lstrip(b" \t,")
+    n = len(s)
+    end = 0
+    while end < n and s[end] in _NUMBER_BYTES:
+        end += 1
+    if end == 0:
+        return None
+    # Then the percentage: spaces, digits, "%"
+    pct = s.find(b"%", end, 40)
+    if pct < 0 or not s[end:pct].strip().isdigit():
+        return None
+    return int(s[:end].translate(None, b","))
+
+
+@functools.lru_cache(maxsize=8)
+def _compile_excludes(excludes: tuple[str, ...]):
+    """Split exclude patterns into (literal names, combined glob matcher or None).
+
+    Plain names (".git", ".venv", ...) become a set lookup; only real globs
+    go through a regex, compiled once for all of them.
+    """
+    literal = frozenset(pat for pat in excludes if not any(c in pat for c in "*?["))
+    globs = [fnmatch.translate(pat) for pat in excludes if pat not in literal]
+    return literal, (re.compile("|".join(globs)).match if globs else None)
 
 
 def _dir_size(root: str, excludes: list[str]) -> int:
     """Walk *root* and return total bytes, skipping *excludes* patterns."""
+    literal, glob_match = _compile_excludes(tuple(excludes))
+
     total = 0
-    root_path = Path(root).resolve()
-    for dirpath, dirnames, filenames in os.walk(root_path):
-        # Prune excluded directories in-place
-        dirnames[:] = [
-            d for d in dirnames
-            if not any(fnmatch.fnmatch(d, pat) for pat in excludes)
-        ]
-        for f in filenames:
-            if any(fnmatch.fnmatch(f, pat) for pat in excludes):
-                continue
-            try:
-                total += (Path(dirpath) / f).stat().st_size
-            except OSError:
-                pass
+    stack = [str(Path(root).resolve())]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if name in literal or (glob_match and glob_match(name)):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
     return total
 
 
+@functools.lru_cache(maxsize=1)
+def _ensure_state_dir() -> None:
+    """Create ~/.spotrun (for known_hosts and state) and its ssh socket dir, once.
+
+    ssh creates a missing known_hosts file but not its directory. Both
+    are private to the user (0700).
+    """
+    _CONTROL_DIR.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    _CONTROL_DIR.mkdir(exist_ok=True, mode=0o700)
+
+
+@functools.lru_cache(maxsize=None)
+def _exe(name: str) -> str:
+    """Absolute path of the *name* executable, or *name* if it isn't on PATH."""
+    return shutil.which(name) or name
+
+
+def _compress_flags(compress: bool | str) -> list[str]:
+    """rsync compression flags for a *compress* setting.
+
+    "auto" (or True) sends plain -z and leaves the algorithm to rsync: 3.2+
+    on both ends negotiates zstd by itself, and older peers fall back to
+    zlib. False sends uncompressed, best for already-compressed data or
+    fast links. Any other string names an rsync --compress-choice
+    algorithm, which both ends must support.
+    """
+    if compress is False:
+        return []
+    if compress is True or compress == "auto":
+        return ["-z"]
+    return [f"--compress-choice={compress}"]
+
+
 def _fmt_size(nbytes: int) -> str:
     """Human-readable size string."""
     for unit in ("B", "KB", "MB", "GB"):
@@ -60,6 +155,75 @@ def _fmt_size(nbytes: int) -> str:
     return f"{nbytes:.1f} TB"
 
 
+def _sync_progress() -> Progress:
+    """Progress display shared by the project sync commands."""
+    return Progress(
+        TextColumn("[bold blue]{task.description}"),
+        BarColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        console=console,
+    )
+
+
+def _run_with_progress(cmd: list[str], progress: Progress, task) -> None:
+    """Run an ``rsync --info=progress2`` command, advancing *task* as it goes.
+
+    Raises CalledProcessError if rsync exits non-zero.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0,
+    )
+
+    # rsync rewrites its progress line with "\r", so read raw bytes and
+    # split on both separators rather than waiting for a "\n"
+    fd = proc.stdout.fileno()
+    pending = b""
+    last_bytes = 0
+    while chunk := os.read(fd, 4096):
+        *lines, pending = (pending + chunk).replace(b"\r", b"\n").split(b"\n")
+        for line in lines:
+            transferred = _parse_progress2(line)
+            if transferred is not None and transferred > last_bytes:
+                progress.update(task, advance=transferred - last_bytes)
+                last_bytes = transferred
+    proc.stdout.close()
+
+    proc.wait()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+# How often a waiting ssh_run checks whether its command has exited
+_STOP_RECHECK = 0.5
+
+
+def _wait_or_stop(proc: subprocess.Popen, stop_event) -> bool:
+    """Block until *proc* exits or *stop_event* is set, whichever is first.
+
+    If the event wins, *proc* is terminated (killed after 10s) and True is
+    returned. The wait sleeps on the event itself, so a stop is acted on
+    at once; process exit is noticed within _STOP_RECHECK seconds.
+    *stop_event* is only read, so one event can safely be shared by
+    several concurrent commands.
+    """
+    while proc.poll() is None:
+        if stop_event.wait(_STOP_RECHECK):
+            break
+    else:
+        return False
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    return True
+
+
 class DataSync:
     """Transfer files to/from a remote host over SSH."""
 
@@ -68,24 +232,42 @@ class DataSync:
         self.pem_path = pem_path
         self.user = user
         self.last_output_tail: str = ""
-        self.ssh_opts = [
-            "-i", pem_path,
-            "-o", "StrictHostKeyChecking=accept-new",
-            "-o", f"UserKnownHostsFile={_KNOWN_HOSTS}",
-            "-o", "ServerAliveInterval=15",
-            "-o", "ServerAliveCountMax=3",
-        ]
+        _ensure_state_dir()
+        self.ssh_opts = ["-i", pem_path, *_SSH_COMMON_OPTS]
         self.remote = f"{user}@{host}"
+        # Only the key path varies per host; the rest is quoted at import
+        self._ssh_cmd = f"ssh -i {shlex.quote(pem_path)} {_SSH_COMMON_OPTS_STR}"
+
+    def close(self) -> None:
+        """Shut down the shared SSH master connection, if one is running."""
+        subprocess.run(
+            [_exe("ssh"), *self.ssh_opts, "-O", "exit", self.remote],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            close_fds=False,
+        )
 
     def _ssh_cmd_str(self) -> str:
-        """Build an SSH command string for rsync -e, properly quoting paths."""
-        return "ssh " + " ".join(shlex.quote(opt) for opt in self.ssh_opts)
+        """SSH command string for rsync -e, with paths properly quoted."""
+        return self._ssh_cmd
+
+    @functools.cached_property
+    def _cols(self) -> int:
+        """Local terminal width, looked up once per DataSync."""
+        try:
+            return os.get_terminal_size().columns
+        except OSError:
+            return 120
 
     def rsync_to(self, local_path: str, remote_path: str,
-                 quiet: bool = False) -> None:
-        """Rsync a local path to the remote host."""
+                 quiet: bool = False, compress: bool | str = "auto") -> None:
+        """Rsync a local path to the remote host.
+
+        *compress* is "auto", True, False or an rsync compression algorithm
+        name (see _compress_flags).
+        """
         cmd = [
-            "rsync", "-az",
+            "rsync", "-a", *_compress_flags(compress),
             "-e", self._ssh_cmd_str(),
             local_path,
             f"{self.remote}:{remote_path}",
@@ -98,6 +280,58 @@ class DataSync:
             cmd.insert(2, "--info=progress2")
             subprocess.run(cmd, check=True)
 
+    def _rsync_project_cmd(
+        self, local_root: str, remote_root: str, excludes: list[str],
+        compress: bool | str = "auto",
+    ) -> list[str]:
+        """Build the rsync command that mirrors *local_root* into *remote_root*."""
+        # -u: leave alone files that are already newer on the remote
+        cmd = [
+            "rsync", "-au", *_compress_flags(compress), "--info=progress2",
+            "-e", self._ssh_cmd_str(),
+        ]
+        for exc in excludes:
+            cmd.extend(["--exclude", exc])
+        # Ensure trailing slash so contents are synced into remote_root
+        local = local_root.rstrip("/") + "/"
+        cmd.extend([local, f"{self.remote}:{remote_root}"])
+        return cmd
+
+    def _rsync_dry_run(self, cmd: list[str]) -> tuple[int, list[str]] | None:
+        """Dry-run rsync *cmd*, returning (bytes it would send, files it would send).
+
+        Uses the real transfer's filters, so the byte count is exactly what
+        ``--info=progress2`` will report. Returns None if the dry run fails or
+        its output can't be parsed, so the caller falls back to one stream.
+        """
+        # "F:" marks our file lines apart from the --stats summary;
+        # directories (trailing "/") are left to _rsync_sharded's final pass.
+        # -8 prints non-ASCII names as-is instead of as \#ooo escapes, and
+        # os.fsdecode keeps bytes that aren't valid UTF-8 as surrogates, so
+        # every name round-trips unchanged into the --files-from lists.
+        probe = [cmd[0], "-n", "-8", "--stats", "--out-format=F:%n"]
+        probe += [c for c in cmd[1:] if c != "--info=progress2"]
+        result = subprocess.run(probe, capture_output=True)
+        if result.returncode != 0:
+            return None
+        total = None
+        files = []
+        try:
+            for line in os.fsdecode(result.stdout).split("\n"):
+                if line.startswith("F:"):
+                    if "\\#" in line:
+                        # Control characters are still escaped even with -8
+                        return None
+                    if not line.endswith("/"):
+                        files.append(line[2:])
+                elif line.startswith("Total transferred file size:"):
+                    total = int(line.split(":", 1)[1].split()[0].replace(",", ""))
+        except (ValueError, IndexError):
+            return None
+        if total is None:
+            return None
+        return total, files
+
     def rsync_project(
         self,
         local_root: str,
@@ -105,6 +339,7 @@ class DataSync:
         excludes: list[str] | None = None,
         quiet: bool = False,
         n_instances: int = 1,
+        compress: bool | str = "auto",
     ) -> None:
         """Rsync an entire project directory with a progress bar.
 
@@ -114,18 +349,11 @@ class DataSync:
             excludes: Glob patterns to exclude.
             quiet: If True, suppress all output.
             n_instances: Total instances being synced to (for display only).
+            compress: "auto" (let rsync negotiate, zstd on 3.2+), True,
+                False, or an rsync compression algorithm name.
         """
         excludes = list(excludes) if excludes is not None else list(DEFAULT_EXCLUDES)
-
-        cmd = [
-            "rsync", "-az", "--info=progress2",
-            "-e", self._ssh_cmd_str(),
-        ]
-        for exc in excludes:
-            cmd.extend(["--exclude", exc])
-        # Ensure trailing slash so contents are synced into remote_root
-        local = local_root.rstrip("/") + "/"
-        cmd.extend([local, f"{self.remote}:{remote_root}"])
+        cmd = self._rsync_project_cmd(local_root, remote_root, excludes, compress)
 
         if quiet:
             quiet_cmd = [c for c in cmd if c != "--info=progress2"]
@@ -133,8 +361,13 @@ class DataSync:
                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return
 
-        # Calculate total transfer size for the progress bar
-        total_bytes = _dir_size(local_root, excludes)
+        # Ask rsync how much it will send (over the shared SSH connection);
+        # fall back to sizing the local tree if that fails
+        probe = self._rsync_dry_run(cmd)
+        if probe is not None:
+            total_bytes, files = probe
+        else:
+            total_bytes, files = _dir_size(local_root, excludes), []
         total_display = total_bytes * n_instances
 
         if n_instances > 1:
@@ -142,37 +375,53 @@ class DataSync:
         else:
             desc = f"Syncing project ({_fmt_size(total_bytes)})"
 
-        with Progress(
-            TextColumn("[bold blue]{task.description}"),
-            BarColumn(),
-            DownloadColumn(),
-            TransferSpeedColumn(),
-            console=console,
-        ) as progress:
+        with _sync_progress() as progress:
             task = progress.add_task(desc, total=total_display)
+            if total_bytes > _SHARD_MIN_BYTES and len(files) >= _SHARD_COUNT:
+                self._rsync_sharded(cmd, files, progress, task)
+            else:
+                _run_with_progress(cmd, progress, task)
+            if probe is None or n_instances > 1:
+                # The total was only an estimate; rsync won't land exactly on it
+                progress.update(task, completed=total_display)
+
+    def _rsync_sharded(
+        self, cmd: list[str], files: list[str], progress: Progress, task,
+    ) -> None:
+        """Send *files* as _SHARD_COUNT parallel runs of *cmd*, all advancing *task*.
 
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-            )
-
-            last_bytes = 0
-            for line in proc.stdout:
-                m = _PROGRESS2_RE.match(line.strip())
-                if m:
-                    transferred = int(m.group(1).replace(",", ""))
-                    if transferred > last_bytes:
-                        progress.update(task, advance=transferred - last_bytes)
-                        last_bytes = transferred
-
-            proc.wait()
-            if proc.returncode != 0:
-                raise subprocess.CalledProcessError(proc.returncode, cmd)
-
-            # Ensure bar completes (rsync may not report 100% exactly)
-            progress.update(task, completed=total_display)
+        Files are split across the streams by path hash and passed to each
+        rsync with ``--files-from``. A final single rsync then syncs just the
+        directory tree, which creates empty directories and sets directory
+        permissions and mtimes after the files inside them have landed.
+        """
+        shards: list[list[str]] = [[] for _ in range(_SHARD_COUNT)]
+        for name in files:
+            shards[zlib.crc32(os.fsencode(name)) % _SHARD_COUNT].append(name)
+
+        with tempfile.TemporaryDirectory(prefix="spotrun-rsync-") as tmp:
+            shard_cmds = []
+            for i, names in enumerate(shards):
+                if not names:
+                    continue
+                list_path = os.path.join(tmp, f"shard{i}")
+                with open(list_path, "wb") as f:
+                    f.write(b"".join(os.fsencode(n) + b"\n" for n in names))
+                shard_cmds.append(cmd[:-2] + [f"--files-from={list_path}", *cmd[-2:]])
+            with ThreadPoolExecutor(max_workers=len(shard_cmds)) as pool:
+                futures = [
+                    pool.submit(_run_with_progress, c, progress, task)
+                    for c in shard_cmds
+                ]
+                for future in futures:
+                    future.result()
+
+        # Directories only: the excludes in cmd still apply, since rsync
+        # uses the first matching filter rule
+        dirs_cmd = [c for c in cmd[:-2] if c != "--info=progress2"]
+        dirs_cmd += ["--include=*/", "--exclude=*", *cmd[-2:]]
+        subprocess.run(dirs_cmd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
     def scp_to(self, local_path: str, remote_path: str) -> None:
         """SCP a single file to the remote host."""
@@ -184,6 +433,16 @@ class DataSync:
         ]
         subprocess.run(cmd, check=True)
 
+    def scp_many(self, local_paths: list[str], remote_dir: str) -> None:
+        """SCP several files into *remote_dir* over a single connection."""
+        cmd = [
+            "scp",
+            *self.ssh_opts,
+            *local_paths,
+            f"{self.remote}:{remote_dir.rstrip('/')}/",
+        ]
+        subprocess.run(cmd, check=True)
+
     def ssh_run(
         self, command: str, capture: bool = False, quiet: bool = False,
         stop_event=None, tail_lines: int = 0,
@@ -198,14 +457,18 @@ class DataSync:
         stdout/stderr in ``self.last_output_tail`` (useful for error diagnostics).
         Otherwise, stream to terminal and return the exit code.
         """
+        # Absolute ssh path + close_fds=False lets subprocess use posix_spawn
+        # (vfork) rather than fork+exec; our own fds are non-inheritable anyway
         cmd = [
-            "ssh",
+            _exe("ssh"),
             *self.ssh_opts,
             self.remote,
             command,
         ]
         if capture:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, close_fds=False,
+            )
             if result.returncode != 0:
                 raise subprocess.CalledProcessError(
                     result.returncode, cmd, result.stdout, result.stderr
@@ -218,33 +481,22 @@ class DataSync:
                 proc = subprocess.Popen(
                     cmd, stdin=subprocess.DEVNULL,
                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    close_fds=False,
                 )
-                while proc.poll() is None:
-                    if stop_event.is_set():
-                        proc.terminate()
-                        try:
-                            proc.wait(timeout=10)
-                        except subprocess.TimeoutExpired:
-                            proc.kill()
-                            proc.wait()
-                        return -1
-                    import time
-                    time.sleep(1)
+                if _wait_or_stop(proc, stop_event):
+                    return -1
                 return proc.returncode
             result = subprocess.run(
                 cmd, stdin=subprocess.DEVNULL,
                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                close_fds=False,
             )
             return result.returncode
         # Force PTY allocation so remote Rich progress bars render properly.
         # Pass local terminal width so remote Rich renders at the right size.
-        try:
-            cols = os.get_terminal_size().columns
-        except OSError:
-            cols = 120
-        wrapped = f"export COLUMNS={cols}; {command}"
-        interactive_cmd = ["ssh", "-t", *self.ssh_opts, self.remote, wrapped]
-        result = subprocess.run(interactive_cmd)
+        wrapped = f"export COLUMNS={self._cols}; {command}"
+        interactive_cmd = [_exe("ssh"), "-t", *self.ssh_opts, self.remote, wrapped]
+        result = subprocess.run(interactive_cmd, close_fds=False)
         return result.returncode
 
     def _ssh_run_quiet_tail(
@@ -256,8 +508,6 @@ class DataSync:
         A background reader thread drains the pipe so the remote process
         never blocks on a full buffer.
         """
-        import threading as _threading
-        import time as _time
         from collections import deque
 
         tail: deque[str] = deque(maxlen=tail_lines)
@@ -265,7 +515,7 @@ class DataSync:
         proc = subprocess.Popen(
             cmd, stdin=subprocess.DEVNULL,
             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            text=True,
+            text=True, close_fds=False,
         )
 
         def _reader() -> None:
@@ -274,28 +524,14 @@ class DataSync:
                 tail.append(line.rstrip("\n"))
             proc.stdout.close()
 
-        reader = _threading.Thread(target=_reader, daemon=True)
+        reader = threading.Thread(target=_reader, daemon=True)
         reader.start()
 
-        if stop_event is not None:
-            while proc.poll() is None:
-                if stop_event.is_set():
-                    proc.terminate()
-                    try:
-                        proc.wait(timeout=10)
-                    except subprocess.TimeoutExpired:
-                        proc.kill()
-                        proc.wait()
-                    reader.join(timeout=5)
-                    self.last_output_tail = "\n".join(tail)
-                    return -1
-                _time.sleep(1)
-        else:
-            proc.wait()
-
+        stopped = stop_event is not None and _wait_or_stop(proc, stop_event)
+        proc.wait()
         reader.join(timeout=5)
         self.last_output_tail = "\n".join(tail)
-        return proc.returncode
+        return -1 if stopped else proc.returncode
 
     def ssh_interactive(self) -> None:
         """Replace this process with an interactive SSH session."""
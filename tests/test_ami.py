@@ -0,0 +1,74 @@
+"""Tests for AMIManager's snapshot wait in spotrun.ami."""
+
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from spotrun import ami
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    now = [1000.0]
+    recorded: list[float] = []
+
+    def _sleep(seconds: float) -> None:
+        recorded.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(ami.time, "time", lambda: now[0])
+    monkeypatch.setattr(ami.time, "sleep", _sleep)
+    return recorded
+
+
+def _manager(*responses) -> ami.AMIManager:
+    ec2 = mock.Mock()
+    ec2.client.describe_images.side_effect = list(responses)
+    return ami.AMIManager(ec2)
+
+
+def _image(state: str, *snapshot_ids, **extra) -> dict:
+    mappings = [{"DeviceName": "/dev/sda1", "Ebs": {"SnapshotId": s}} for s in snapshot_ids]
+    # Instance-store mappings have no Ebs entry and never get a snapshot
+    mappings.append({"DeviceName": "/dev/sdb", "VirtualName": "ephemeral0"})
+    return {"Images": [{"State": state, "BlockDeviceMappings": mappings, **extra}]}
+
+
+def test_waits_until_every_volume_has_a_snapshot(sleeps):
+    mgr = _manager(
+        ClientError({"Error": {"Code": "InvalidAMIID.NotFound", "Message": ""}}, "DescribeImages"),
+        {"Images": [{"State": "pending"}]},
+        _image("pending", "snap-1", ""),
+        _image("pending", "snap-1", "snap-2"),
+    )
+    mgr._wait_for_snapshots("ami-1")
+    assert sleeps == [5, 5, 5]
+
+
+def test_available_image_returns_at_once(sleeps):
+    _manager({"Images": [{"State": "available"}]})._wait_for_snapshots("ami-1")
+    assert sleeps == []
+
+
+def test_failed_image_raises_with_reason(sleeps):
+    mgr = _manager(_image("failed", StateReason={"Message": "Client.InternalError"}))
+    with pytest.raises(RuntimeError, match="Client.InternalError"):
+        mgr._wait_for_snapshots("ami-1")
+
+
+def test_other_errors_propagate(sleeps):
+    mgr = _manager(
+        ClientError({"Error": {"Code": "UnauthorizedOperation", "Message": ""}}, "DescribeImages"),
+    )
+    with pytest.raises(ClientError):
+        mgr._wait_for_snapshots("ami-1")
+
+
+def test_times_out(sleeps):
+    mgr = _manager(*[_image("pending", "")] * 3)
+    with pytest.raises(TimeoutError):
+        mgr._wait_for_snapshots("ami-1", timeout=15)
+    assert sleeps == [5, 5, 5]
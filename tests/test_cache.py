@@ -0,0 +1,68 @@
+"""Tests for the on-disk JSON caches in spotrun.cache."""
+
+from __future__ import annotations
+
+import json
+
+from spotrun import cache
+
+
+def test_put_then_get(tmp_path):
+    path = tmp_path / "prices.json"
+    cache.cache_put(path, "us-east-1:c7i.large", prices={"c7i.large": 0.03})
+    entry = cache.cache_get(path, "us-east-1:c7i.large", ttl=60)
+    assert entry["prices"] == {"c7i.large": 0.03}
+    assert "ts" in entry
+
+
+def test_missing_file_and_key(tmp_path):
+    path = tmp_path / "missing.json"
+    assert cache.cache_get(path, "k", ttl=60) is None
+    cache.cache_put(path, "other", value=1)
+    assert cache.cache_get(path, "k", ttl=60) is None
+
+
+def test_expired_entry(tmp_path, monkeypatch):
+    path = tmp_path / "c.json"
+    monkeypatch.setattr(cache.time, "time", lambda: 1000.0)
+    cache.cache_put(path, "k", value=1)
+    monkeypatch.setattr(cache.time, "time", lambda: 1059.0)
+    assert cache.cache_get(path, "k", ttl=60) == {"ts": 1000.0, "value": 1}
+    monkeypatch.setattr(cache.time, "time", lambda: 1060.0)
+    assert cache.cache_get(path, "k", ttl=60) is None
+
+
+def test_put_keeps_other_keys(tmp_path):
+    path = tmp_path / "c.json"
+    cache.cache_put(path, "a", value=1)
+    cache.cache_put(path, "b", value=2)
+    assert cache.cache_get(path, "a", ttl=60)["value"] == 1
+    assert cache.cache_get(path, "b", ttl=60)["value"] == 2
+
+
+def test_delete(tmp_path):
+    path = tmp_path / "c.json"
+    cache.cache_put(path, "a", value=1)
+    cache.cache_put(path, "b", value=2)
+    cache.cache_delete(path, "a")
+    cache.cache_delete(path, "never-there")
+    assert cache.cache_get(path, "a", ttl=60) is None
+    assert cache.cache_get(path, "b", ttl=60)["value"] == 2
+
+
+def test_corrupt_or_non_dict_file_reads_as_empty(tmp_path):
+    path = tmp_path / "c.json"
+    path.write_text("{not json")
+    assert cache.cache_get(path, "k", ttl=60) is None
+    path.write_text(json.dumps(["a", "list"]))
+    assert cache.cache_get(path, "k", ttl=60) is None
+    # A write replaces the unreadable contents
+    cache.cache_put(path, "k", value=1)
+    assert cache.cache_get(path, "k", ttl=60)["value"] == 1
+
+
+def test_write_is_atomic_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "sub" / "c.json"
+    cache.cache_put(path, "k", value=1)
+    assert json.loads(path.read_text())["k"]["value"] == 1
+    assert [p.name for p in path.parent.iterdir()] == ["c.json"]
@@ -0,0 +1,343 @@
+"""Tests for EC2Manager polling and retry logic in spotrun.ec2."""
+
+from __future__ import annotations
+
+import socket
+import threading
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from spotrun import ec2
+
+
+def _client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Op")
+
+
+def _manager(client) -> ec2.EC2Manager:
+    mgr = ec2.EC2Manager.__new__(ec2.EC2Manager)
+    mgr.region = "us-east-1"
+    mgr.client = client
+    return mgr
+
+
+class _Clock:
+    """Stands in for time.time/time.sleep, recording every sleep."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ec2.time, "time", clock.time)
+    monkeypatch.setattr(ec2.time, "sleep", clock.sleep)
+    return clock
+
+
+def _instance(state: str, **extra) -> dict:
+    return {"Reservations": [{"Instances": [{"State": {"Name": state}, **extra}]}]}
+
+
+def test_wait_for_running_polls_on_the_delay_schedule(clock):
+    client = mock.Mock()
+    client.describe_instances.side_effect = [
+        _client_error("InvalidInstanceID.NotFound"),
+        *[_instance("pending")] * 8,
+        _instance("running", PublicIpAddress="203.0.113.5"),
+    ]
+    assert _manager(client).wait_for_running("i-123") == "203.0.113.5"
+    # Short polls first, then the last delay repeats
+    assert clock.sleeps == [2, 2, 3, 5, 8, 13, 15, 15, 15]
+
+
+def test_wait_for_running_times_out_before_oversleeping(clock):
+    client = mock.Mock()
+    client.describe_instances.return_value = _instance("pending")
+    with pytest.raises(TimeoutError):
+        _manager(client).wait_for_running("i-123", timeout=20)
+    assert clock.sleeps == [2, 2, 3, 5, 8]
+
+
+def test_wait_for_running_fails_fast_on_terminal_state(clock):
+    client = mock.Mock()
+    client.describe_instances.return_value = _instance(
+        "terminated", StateReason={"Message": "Server.SpotInstanceTermination"},
+    )
+    with pytest.raises(RuntimeError, match="SpotInstanceTermination"):
+        _manager(client).wait_for_running("i-123")
+    assert clock.sleeps == []
+
+
+def test_wait_for_running_reraises_other_errors(clock):
+    client = mock.Mock()
+    client.describe_instances.side_effect = _client_error("UnauthorizedOperation")
+    with pytest.raises(ClientError):
+        _manager(client).wait_for_running("i-123")
+
+
+@pytest.fixture
+def spotrun_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ec2, "SPOTRUN_DIR", tmp_path)
+    return tmp_path
+
+
+def test_local_pem_is_trusted_without_asking_aws(spotrun_dir):
+    (spotrun_dir / "proj-us-east-1.pem").write_text("key")
+    client = mock.Mock()
+    _manager(client)._ensure_key_pair("proj-us-east-1", str(spotrun_dir / "proj-us-east-1.pem"))
+    client.describe_key_pairs.assert_not_called()
+    client.create_key_pair.assert_not_called()
+
+
+def test_run_instances_recreates_missing_key_pair_and_retries_once(spotrun_dir):
+    pem = spotrun_dir / "proj-us-east-1.pem"
+    pem.write_text("stale key")
+    pem.chmod(0o400)
+    client = mock.Mock()
+    client.run_instances.side_effect = [
+        _client_error("InvalidKeyPair.NotFound"),
+        {"Instances": [{"InstanceId": "i-123"}]},
+    ]
+    client.describe_key_pairs.side_effect = _client_error("InvalidKeyPair.NotFound")
+    client.create_key_pair.return_value = {"KeyMaterial": "new key"}
+
+    instance_id = _manager(client).request_spot_instance(
+        "c6a.xlarge", "ami-1", "proj-us-east-1", "sg-1",
+    )
+
+    assert instance_id == "i-123"
+    assert client.run_instances.call_count == 2
+    client.create_key_pair.assert_called_once_with(KeyName="proj-us-east-1")
+    assert pem.read_text() == "new key"
+
+
+def test_run_instances_gives_up_after_one_key_pair_retry(spotrun_dir):
+    client = mock.Mock()
+    client.run_instances.side_effect = _client_error("InvalidKeyPair.NotFound")
+    client.describe_key_pairs.side_effect = _client_error("InvalidKeyPair.NotFound")
+    client.create_key_pair.return_value = {"KeyMaterial": "new key"}
+    with pytest.raises(ClientError):
+        _manager(client).request_spot_instance("c6a.xlarge", "ami-1", "proj-us-east-1", "sg-1")
+    assert client.run_instances.call_count == 2
+
+
+def test_run_instances_other_errors_are_not_retried(spotrun_dir):
+    client = mock.Mock()
+    client.run_instances.side_effect = _client_error("InsufficientInstanceCapacity")
+    with pytest.raises(ClientError):
+        _manager(client).request_spot_instance("c6a.xlarge", "ami-1", "proj-us-east-1", "sg-1")
+    assert client.run_instances.call_count == 1
+    client.create_key_pair.assert_not_called()
+
+
+def _redirect_ssh_port(monkeypatch, port: int) -> None:
+    """Send _probe_ssh's connections for port 22 to *port* on the same host."""
+    real_socket = socket.socket
+
+    class _RedirectedSocket(real_socket):
+        def connect_ex(self, address):
+            return super().connect_ex((address[0], port))
+
+    monkeypatch.setattr(ec2.socket, "socket", _RedirectedSocket)
+
+
+@pytest.fixture
+def sshd(monkeypatch):
+    """A local listener standing in for port 22; set ``banner`` to reply on connect."""
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    state = {"banner": None, "conns": []}
+
+    def _serve() -> None:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            state["conns"].append(conn)
+            if state["banner"] is not None:
+                conn.sendall(state["banner"])
+
+    threading.Thread(target=_serve, daemon=True).start()
+
+    _redirect_ssh_port(monkeypatch, port)
+    yield state
+    server.close()
+    for conn in state["conns"]:
+        conn.close()
+
+
+def test_probe_ssh_true_on_ssh_banner(sshd):
+    sshd["banner"] = b"SSH-2.0-OpenSSH_9.6\r\n"
+    assert ec2._probe_ssh("127.0.0.1", timeout=2.0) is True
+
+
+def test_probe_ssh_false_on_other_banner(sshd):
+    sshd["banner"] = b"HTTP/1.1 400 Bad Request\r\n"
+    assert ec2._probe_ssh("127.0.0.1", timeout=2.0) is False
+
+
+def test_probe_ssh_none_when_port_open_but_silent(sshd):
+    assert ec2._probe_ssh("127.0.0.1", timeout=0.2) is None
+
+
+def test_probe_ssh_false_when_refused(monkeypatch):
+    with socket.create_server(("127.0.0.1", 0)) as s:
+        port = s.getsockname()[1]
+    _redirect_ssh_port(monkeypatch, port)
+    assert ec2._probe_ssh("127.0.0.1", timeout=2.0) is False
+
+
+def test_wait_for_ssh_backs_off_only_after_refusals(clock, monkeypatch):
+    probes = iter([False, False, None, False, True])
+    monkeypatch.setattr(ec2, "_probe_ssh", lambda ip: next(probes))
+    _manager(mock.Mock()).wait_for_ssh("203.0.113.5")
+    # An unanswered probe (None) already waited, so it retries at once
+    assert clock.sleeps == [1.0, 1.5, 2.25]
+
+
+def test_wait_for_ssh_times_out(clock, monkeypatch):
+    monkeypatch.setattr(ec2, "_probe_ssh", lambda ip: False)
+    with pytest.raises(TimeoutError):
+        _manager(mock.Mock()).wait_for_ssh("203.0.113.5", timeout=10)
+    assert clock.sleeps == [1.0, 1.5, 2.25, 3.375, 5.0625]
+
+
+def test_ttl_cache_reuses_results_until_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ec2.time, "monotonic", lambda: now[0])
+    calls = []
+
+    @ec2._ttl_cache(60)
+    def lookup(region, types):
+        calls.append((region, types))
+        return len(calls)
+
+    assert lookup("us-east-1", ["a", "b"]) == 1
+    # Sequence arguments are keyed by their contents, in any order
+    assert lookup("us-east-1", ("b", "a")) == 1
+    assert lookup("us-west-2", ["a", "b"]) == 2
+    now[0] += 59.9
+    assert lookup("us-east-1", ["a", "b"]) == 1
+    now[0] += 0.1
+    assert lookup("us-east-1", ["a", "b"]) == 3
+
+
+def test_ttl_cache_does_not_cache_errors():
+    results = iter([RuntimeError("throttled"), "ok"])
+
+    @ec2._ttl_cache(60)
+    def lookup(region):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    with pytest.raises(RuntimeError):
+        lookup("us-east-1")
+    assert lookup("us-east-1") == "ok"
+
+
+def test_ttl_cache_clear():
+    calls = []
+
+    @ec2._ttl_cache(60)
+    def lookup(region):
+        calls.append(region)
+        return len(calls)
+
+    assert lookup("us-east-1") == 1
+    lookup.cache_clear()
+    assert lookup("us-east-1") == 2
+
+
+@pytest.fixture
+def price_client(tmp_path, monkeypatch):
+    """A mocked EC2 client for every region, with the on-disk price cache under tmp_path."""
+    client = mock.Mock()
+    # One row per AZ, split across pages
+    client.get_paginator.return_value.paginate.return_value = [
+        {"SpotPriceHistory": [
+            {"InstanceType": "c6a.xlarge", "SpotPrice": "0.0700"},
+            {"InstanceType": "c6a.2xlarge", "SpotPrice": "0.1300"},
+        ]},
+        {"SpotPriceHistory": [
+            {"InstanceType": "c6a.xlarge", "SpotPrice": "0.0650"},
+        ]},
+    ]
+    monkeypatch.setattr(ec2, "_ec2_client", lambda region: client)
+    monkeypatch.setattr(ec2, "PRICE_CACHE_FILE", tmp_path / "prices.json")
+    ec2.clear_price_cache()
+    yield client
+    ec2.clear_price_cache()
+
+
+def test_get_spot_prices_is_cached_and_cleared(price_client):
+    paginate = price_client.get_paginator.return_value.paginate
+    mgr = _manager(price_client)
+
+    prices = mgr.get_spot_prices(["c6a.xlarge", "c6a.2xlarge"])
+    assert prices == {"c6a.xlarge": 0.065, "c6a.2xlarge": 0.13}
+    # Callers get a copy, so mutating it leaves the cached dict alone
+    prices.clear()
+    assert mgr.get_spot_prices(["c6a.2xlarge", "c6a.xlarge"]) == {
+        "c6a.xlarge": 0.065, "c6a.2xlarge": 0.13,
+    }
+    assert paginate.call_count == 1
+
+    ec2.clear_price_cache()
+    mgr.get_spot_prices(["c6a.xlarge", "c6a.2xlarge"])
+    assert paginate.call_count == 2
+
+
+def test_spot_prices_persist_on_disk_between_processes(price_client, tmp_path):
+    paginate = price_client.get_paginator.return_value.paginate
+    _manager(price_client).get_spot_prices(["c6a.xlarge", "c6a.2xlarge"])
+    assert (tmp_path / "prices.json").exists()
+
+    # A new process starts with an empty in-memory cache but reads the file
+    ec2._region_spot_prices.cache_clear()
+    assert _manager(price_client).get_spot_prices(["c6a.2xlarge", "c6a.xlarge"]) == {
+        "c6a.xlarge": 0.065, "c6a.2xlarge": 0.13,
+    }
+    assert paginate.call_count == 1
+
+    ec2.clear_price_cache()
+    assert not (tmp_path / "prices.json").exists()
+
+
+def test_scan_region_prices_sorts_and_refreshes(tmp_path, monkeypatch):
+    region_prices = {"us-east-1": "0.0900", "us-west-2": "0.0700", "eu-west-1": None}
+    clients = {}
+    for region, price in region_prices.items():
+        rows = [{"InstanceType": "c6a.xlarge", "SpotPrice": price}] if price else []
+        clients[region] = mock.Mock()
+        clients[region].get_paginator.return_value.paginate.return_value = [
+            {"SpotPriceHistory": rows},
+        ]
+    monkeypatch.setattr(ec2, "_ec2_client", clients.__getitem__)
+    monkeypatch.setattr(ec2, "PRICE_CACHE_FILE", tmp_path / "prices.json")
+    ec2.clear_price_cache()
+    paginate = clients["us-east-1"].get_paginator.return_value.paginate
+
+    # Regions without data are left out
+    expected = [("us-west-2", 0.07), ("us-east-1", 0.09)]
+    assert ec2.scan_region_prices("c6a.xlarge", list(region_prices)) == expected
+    assert ec2.scan_region_prices("c6a.xlarge", list(region_prices)) == expected
+    assert paginate.call_count == 1
+
+    assert ec2.scan_region_prices("c6a.xlarge", list(region_prices), refresh=True) == expected
+    assert paginate.call_count == 2
+    ec2.clear_price_cache()
@@ -0,0 +1,84 @@
+"""Tests for instance selection in spotrun.pricing."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from spotrun import pricing
+
+
+def test_candidates_filter_by_vcpus_per_arch():
+    # x86 needs workers * 2 + 1 vCPUs, ARM workers + 1
+    assert pricing._candidates_by_vcpu(4, False) == (
+        ("c6a.4xlarge", 16), ("c6a.8xlarge", 32), ("c6a.12xlarge", 48), ("c6a.16xlarge", 64),
+    )
+    assert pricing._candidates_by_vcpu(4, True)[:3] == (
+        ("c6g.2xlarge", 8), ("c6g.4xlarge", 16), ("c6a.4xlarge", 16),
+    )
+
+
+def test_candidates_are_cached_per_worker_count():
+    pricing._candidates_by_vcpu.cache_clear()
+    first = pricing._candidates_by_vcpu(8, False)
+    assert pricing._candidates_by_vcpu(8, False) is first
+    assert pricing._candidates_by_vcpu(8, True) is not first
+    assert pricing._candidates_by_vcpu.cache_info().hits == 1
+
+
+@pytest.mark.parametrize(
+    ("workers", "include_arm"),
+    [(0, False), (32, False), (64, True)],
+)
+def test_candidates_reject_unsupported_worker_counts(workers, include_arm):
+    with pytest.raises(ValueError):
+        pricing._candidates_by_vcpu(workers, include_arm)
+
+
+def test_max_workers_fit_the_largest_instance():
+    assert pricing._candidates_by_vcpu(pricing.MAX_WORKERS_X86, False) == (("c6a.16xlarge", 64),)
+    assert pricing._candidates_by_vcpu(pricing.MAX_WORKERS_ARM, True) == (("c6g.16xlarge", 64),)
+
+
+def test_ranked_result_does_not_alias_the_cache():
+    ranked = pricing.select_ranked_instances(4)
+    ranked.clear()
+    assert pricing.select_ranked_instances(4)[0] == ("c6a.4xlarge", 16)
+
+
+def test_select_instance_without_prices_takes_the_smallest():
+    assert pricing.select_instance(4) == ("c6a.4xlarge", 16)
+    assert pricing.select_instance(4, include_arm=True) == ("c6g.2xlarge", 8)
+
+
+def test_select_instance_picks_the_cheapest_priced_candidate():
+    prices = {"c6a.xlarge": 0.01, "c6a.4xlarge": 0.40, "c6a.8xlarge": 0.35, "c6a.16xlarge": 0.90}
+    # c6a.xlarge is cheapest but too small for 4 workers
+    assert pricing.select_instance(4, prices=prices) == ("c6a.8xlarge", 32)
+
+
+def test_select_instance_ties_go_to_the_smaller_instance():
+    prices = {"c6a.16xlarge": 0.30, "c6a.8xlarge": 0.30, "c6a.4xlarge": 0.50}
+    assert pricing.select_instance(4, prices=prices) == ("c6a.8xlarge", 32)
+    prices = {"c6a.4xlarge": 0.30, "c6g.4xlarge": 0.30}
+    # Same vCPUs: COMPUTE_INSTANCES order decides
+    assert pricing.select_instance(4, prices=prices, include_arm=True) == ("c6g.4xlarge", 16)
+
+
+def test_select_instance_without_priced_candidates_falls_back(caplog):
+    with caplog.at_level("WARNING", logger="spotrun.pricing"):
+        assert pricing.select_instance(4, prices={"c6a.xlarge": 0.01}) == ("c6a.4xlarge", 16)
+    assert "falling back" in caplog.text
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_select_instance_matches_the_ranked_head(seed):
+    # Two-decimal prices make ties common
+    rng = random.Random(seed)
+    prices = {it: round(rng.uniform(0.05, 0.5), 2) for it, _, _ in pricing.COMPUTE_INSTANCES}
+    for workers in (1, 4, 15, 31):
+        for include_arm in (False, True):
+            assert pricing.select_instance(workers, prices, include_arm) == (
+                pricing.select_ranked_instances(workers, prices, include_arm)[0]
+            )
@@ -0,0 +1,143 @@
+"""Tests for Session's region and instance type fallback in spotrun.session."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+from spotrun import session
+from spotrun.exceptions import SpotCapacityError
+
+REGIONS = ["us-east-1", "us-west-2", "eu-west-1"]
+
+
+def _client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Op")
+
+
+class _FakeEC2Manager:
+    """EC2Manager stand-in answering get_spot_prices from ``prices[region]``."""
+
+    prices: dict[str, dict[str, float] | Exception] = {}
+    barrier: threading.Barrier | None = None
+
+    def __init__(self, region: str | None = None) -> None:
+        self.region = region
+
+    def get_spot_prices(self, instance_types) -> dict[str, float]:
+        if self.barrier is not None:
+            # Only passes if every region's lookup is in flight at once
+            self.barrier.wait()
+        result = self.prices[self.region]
+        if isinstance(result, Exception):
+            raise result
+        return dict(result)
+
+    def ensure_infra(self, project_tag: str = "spotrun"):
+        return f"{project_tag}-{self.region}", "/nonexistent/key.pem", "sg-1"
+
+
+@pytest.fixture
+def fake_aws(monkeypatch):
+    monkeypatch.delenv("AWS_REGION", raising=False)
+    monkeypatch.setattr(session, "EC2Manager", _FakeEC2Manager)
+    monkeypatch.setattr(session, "CANDIDATE_REGIONS", REGIONS)
+    monkeypatch.setattr(_FakeEC2Manager, "prices", {})
+    monkeypatch.setattr(_FakeEC2Manager, "barrier", None)
+    return _FakeEC2Manager
+
+
+def _session(monkeypatch, available: set[tuple[str, str]] = frozenset()):
+    """A quiet multi-region Session whose launches succeed only for *available*.
+
+    Returns the session and the list of (region, instance_type) it tried.
+    """
+    s = session.Session(workers=4, region=REGIONS[0], save_state=False, quiet=True)
+    s._region_explicit = False
+    tried: list[tuple[str, str]] = []
+
+    def _do_launch_instance(itype, vcpus, arch, price, *args):
+        tried.append((s.ec2.region, itype))
+        if (s.ec2.region, itype) not in available:
+            raise ClientError(
+                {"Error": {"Code": "InsufficientInstanceCapacity", "Message": "none"}},
+                "RunInstances",
+            )
+        return "203.0.113.5"
+
+    monkeypatch.setattr(s, "_do_launch_instance", _do_launch_instance)
+    return s, tried
+
+
+def test_fallback_fetches_region_prices_concurrently(fake_aws, monkeypatch):
+    fake_aws.barrier = threading.Barrier(len(REGIONS), timeout=5)
+    fake_aws.prices = {r: {"c6a.4xlarge": 0.2} for r in REGIONS}
+    s, tried = _session(monkeypatch, available={("us-east-1", "c6a.4xlarge")})
+    assert s.launch() == "203.0.113.5"
+    assert tried == [("us-east-1", "c6a.4xlarge")]
+
+
+def test_fallback_skips_regions_whose_price_query_fails(fake_aws, monkeypatch):
+    fake_aws.prices = {
+        "us-east-1": {"c6a.4xlarge": 0.3},
+        "us-west-2": _client_error("RequestLimitExceeded"),
+        "eu-west-1": {"c6a.4xlarge": 0.4},
+    }
+    s, tried = _session(monkeypatch)
+    with pytest.raises(SpotCapacityError):
+        s.launch()
+    assert tried == [("us-east-1", "c6a.4xlarge"), ("eu-west-1", "c6a.4xlarge")]
+    assert "Could not query prices in us-west-2" in s.fallback_log
+
+
+def test_fallback_aborts_on_auth_errors(fake_aws, monkeypatch):
+    fake_aws.prices = {
+        "us-east-1": {"c6a.4xlarge": 0.3},
+        "us-west-2": _client_error("AuthFailure"),
+        "eu-west-1": {"c6a.4xlarge": 0.4},
+    }
+    s, tried = _session(monkeypatch)
+    with pytest.raises(ClientError):
+        s.launch()
+    assert tried == []
+
+
+def test_fallback_tries_every_candidate_cheapest_first(fake_aws, monkeypatch):
+    fake_aws.prices = {
+        # c6a.xlarge is too small for 4 workers, however cheap
+        "us-east-1": {
+            "c6a.xlarge": 0.01, "c6a.4xlarge": 0.30, "c6a.8xlarge": 0.50, "c6a.12xlarge": 0.90,
+        },
+        "us-west-2": {"c6a.4xlarge": 0.25, "c6a.8xlarge": 0.50, "c6a.16xlarge": 0.80},
+        "eu-west-1": {"c6a.4xlarge": 0.30, "c6a.8xlarge": 0.45},
+    }
+    s, tried = _session(monkeypatch)
+    with pytest.raises(SpotCapacityError) as excinfo:
+        s.launch()
+    # Equal prices keep discovery order: current region first, then CANDIDATE_REGIONS
+    expected = [
+        ("us-west-2", "c6a.4xlarge"),
+        ("us-east-1", "c6a.4xlarge"),
+        ("eu-west-1", "c6a.4xlarge"),
+        ("eu-west-1", "c6a.8xlarge"),
+        ("us-east-1", "c6a.8xlarge"),
+        ("us-west-2", "c6a.8xlarge"),
+        ("us-west-2", "c6a.16xlarge"),
+        ("us-east-1", "c6a.12xlarge"),
+    ]
+    assert tried == expected
+    assert [(r, it) for r, it, _ in excinfo.value.attempts] == expected
+
+
+def test_fallback_stops_at_the_first_launch_that_succeeds(fake_aws, monkeypatch):
+    fake_aws.prices = {
+        "us-east-1": {"c6a.4xlarge": 0.30},
+        "us-west-2": {"c6a.4xlarge": 0.25, "c6a.8xlarge": 0.35},
+        "eu-west-1": {"c6a.4xlarge": 0.40},
+    }
+    s, tried = _session(monkeypatch, available={("us-east-1", "c6a.4xlarge")})
+    assert s.launch() == "203.0.113.5"
+    assert tried == [("us-west-2", "c6a.4xlarge"), ("us-east-1", "c6a.4xlarge")]
+    assert s.ec2.region == "us-east-1"
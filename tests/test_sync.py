@@ -0,0 +1,258 @@
+"""Tests for the rsync helpers in spotrun.sync."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from spotrun import sync
+
+
+@pytest.fixture
+def datasync(tmp_path, monkeypatch):
+    """A DataSync whose ssh socket directory lives under tmp_path."""
+    monkeypatch.setattr(sync, "_CONTROL_DIR", tmp_path / "cm")
+    return sync.DataSync("203.0.113.5", str(tmp_path / "key.pem"))
+
+
+@pytest.fixture
+def shard_runs(monkeypatch):
+    """Record the --files-from list of every rsync _run_with_progress is given."""
+    sent: list[list[str]] = []
+    lock = threading.Lock()
+
+    def fake_run_with_progress(cmd, progress, task):
+        list_arg = next(c for c in cmd if c.startswith("--files-from="))
+        with open(list_arg.split("=", 1)[1], "rb") as f:
+            names = [os.fsdecode(n) for n in f.read().splitlines()]
+        with lock:
+            sent.append(names)
+
+    monkeypatch.setattr(sync, "_run_with_progress", fake_run_with_progress)
+    return sent
+
+
+def test_rsync_sharded_splits_files_and_syncs_dirs_last(datasync, shard_runs, tmp_path):
+    cmd = datasync._rsync_project_cmd(str(tmp_path), "/opt/project", [".git"], compress=False)
+    # Names that aren't valid UTF-8 must reach rsync byte for byte
+    files = [f"pkg/mod{i}.py" for i in range(20)] + [os.fsdecode(b"pkg/caf\xe9.py")]
+    with mock.patch.object(sync.subprocess, "run") as run:
+        datasync._rsync_sharded(cmd, files, progress=None, task=None)
+
+    assert 1 < len(shard_runs) <= sync._SHARD_COUNT
+    # Every file is sent exactly once
+    assert sorted(n for names in shard_runs for n in names) == sorted(files)
+
+    # Then one pass for the directory tree, with the user's excludes first
+    (dirs_cmd,), kwargs = run.call_args
+    assert kwargs["check"] is True
+    assert "--info=progress2" not in dirs_cmd
+    assert dirs_cmd[-4:] == ["--include=*/", "--exclude=*", *cmd[-2:]]
+    assert dirs_cmd.index("--exclude") < dirs_cmd.index("--include=*/")
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        (b"      1,234,567  45%   12.34MB/s    0:01:23 (xfr#10, to-chk=90/200)", 1234567),
+        (b"  0   0%    0.00kB/s    0:00:00", 0),
+        (b"32,768 100%   31.25MB/s    0:00:00 (xfr#1, ir-chk=1000/1002)", 32768),
+        (b"sending incremental file list", None),
+        (b"2024 notes 50%", None),
+        (b"12%", None),
+        (b"", None),
+    ],
+)
+def test_parse_progress2(line, expected):
+    assert sync._parse_progress2(line) == expected
+
+
+class _FakeProgress:
+    def __init__(self) -> None:
+        self.advanced = []
+
+    def update(self, task, advance):
+        self.advanced.append(advance)
+
+
+def test_run_with_progress_reads_carriage_return_updates():
+    # rsync rewrites one progress line in place with "\r"
+    script = (
+        "import sys\n"
+        "for n in ('1,000', '2,048', '2,048', '10,000'):\n"
+        "    sys.stdout.write(f'\\r      {n}  10%    1.00MB/s    0:00:01')\n"
+        "    sys.stdout.flush()\n"
+        "sys.stdout.write(' (xfr#1, to-chk=0/1)\\n')\n"
+    )
+    progress = _FakeProgress()
+    sync._run_with_progress([sys.executable, "-c", script], progress, task=None)
+    assert progress.advanced == [1000, 1048, 7952]
+
+
+def test_run_with_progress_raises_on_failure():
+    with pytest.raises(subprocess.CalledProcessError):
+        sync._run_with_progress(
+            [sys.executable, "-c", "raise SystemExit(23)"], _FakeProgress(), task=None,
+        )
+
+
+# `rsync -an --stats --out-format=F:%n` from rsync 3.2.7
+DRY_RUN_STATS = b"""\
+F:./
+F:README.md
+F:pkg/
+F:pkg/__init__.py
+F:pkg/data file.bin
+
+Number of files: 5 (reg: 3, dir: 2)
+Number of created files: 5 (reg: 3, dir: 2)
+Number of deleted files: 0
+Number of regular files transferred: 3
+Total file size: 9,876,543 bytes
+Total transferred file size: 1,234,567 bytes
+Literal data: 0 bytes
+Matched data: 0 bytes
+File list size: 0
+File list generation time: 0.001 seconds
+File list transfer time: 0.000 seconds
+Total bytes sent: 215
+Total bytes received: 34
+
+sent 215 bytes  received 34 bytes  498.00 bytes/sec
+total size is 9,876,543  speedup is 39,664.83 (DRY RUN)
+"""
+
+
+def test_rsync_dry_run_reads_stats_and_files(datasync, tmp_path):
+    cmd = datasync._rsync_project_cmd(str(tmp_path), "/opt/project", [], compress=False)
+    with mock.patch.object(
+        sync.subprocess, "run",
+        return_value=mock.Mock(returncode=0, stdout=DRY_RUN_STATS),
+    ) as run:
+        total, files = datasync._rsync_dry_run(cmd)
+
+    assert total == 1234567
+    assert files == ["README.md", "pkg/__init__.py", "pkg/data file.bin"]
+    probe = run.call_args.args[0]
+    assert probe[:5] == ["rsync", "-n", "-8", "--stats", "--out-format=F:%n"]
+    assert "--info=progress2" not in probe
+
+
+def test_rsync_dry_run_keeps_non_utf8_names(datasync):
+    stdout = b"F:caf\xc3\xa9.txt\nF:latin1-\xe9.txt\n" + DRY_RUN_STATS
+    with mock.patch.object(
+        sync.subprocess, "run", return_value=mock.Mock(returncode=0, stdout=stdout),
+    ):
+        _, files = datasync._rsync_dry_run(["rsync", "-au", "src/", "dst"])
+    assert os.fsencode(files[0]) == "café.txt".encode()
+    assert os.fsencode(files[1]) == b"latin1-\xe9.txt"
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        mock.Mock(returncode=23, stdout=DRY_RUN_STATS),
+        mock.Mock(returncode=0, stdout=b"F:README.md\n"),
+        # rsync still escapes control characters in names, even with -8
+        mock.Mock(returncode=0, stdout=b"F:bad\\#012name\n" + DRY_RUN_STATS),
+        mock.Mock(
+            returncode=0,
+            stdout=DRY_RUN_STATS.replace(b"1,234,567 bytes", b"1.23M bytes"),
+        ),
+        mock.Mock(
+            returncode=0,
+            stdout=DRY_RUN_STATS.replace(b"1,234,567 bytes", b""),
+        ),
+    ],
+)
+def test_rsync_dry_run_failure_returns_none(datasync, result):
+    with mock.patch.object(sync.subprocess, "run", return_value=result):
+        assert datasync._rsync_dry_run(["rsync", "-au", "src/", "dst"]) is None
+
+
+def test_dir_size_skips_excludes(tmp_path):
+    (tmp_path / "a.py").write_bytes(b"x" * 10)
+    (tmp_path / "b.pyc").write_bytes(b"x" * 100)
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "c.txt").write_bytes(b"x" * 5)
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "objects").write_bytes(b"x" * 1000)
+    (tmp_path / "pkg" / "__pycache__").mkdir()
+    (tmp_path / "pkg" / "__pycache__" / "c.pyc").write_bytes(b"x" * 1000)
+
+    assert sync._dir_size(str(tmp_path), list(sync.DEFAULT_EXCLUDES)) == 15
+    assert sync._dir_size(str(tmp_path), []) == 2115
+
+
+def test_dir_size_does_not_follow_symlinks(tmp_path):
+    (tmp_path / "real").mkdir()
+    (tmp_path / "real" / "data").write_bytes(b"x" * 100)
+    (tmp_path / "link").symlink_to(tmp_path / "real")
+    # The link itself counts as a small entry, not another copy of the tree
+    assert sync._dir_size(str(tmp_path), []) < 200
+
+
+@pytest.mark.parametrize(
+    ("compress", "expected"),
+    [
+        ("auto", ["-z"]),
+        (True, ["-z"]),
+        (False, []),
+        ("lz4", ["--compress-choice=lz4"]),
+    ],
+)
+def test_compress_flags(compress, expected):
+    assert sync._compress_flags(compress) == expected
+
+
+def test_project_cmd_uses_compress_flags(datasync, tmp_path):
+    cmd = datasync._rsync_project_cmd(str(tmp_path), "/opt/project", [], compress=False)
+    assert cmd[:3] == ["rsync", "-au", "--info=progress2"]
+    cmd = datasync._rsync_project_cmd(str(tmp_path), "/opt/project", [], compress="lz4")
+    assert "--compress-choice=lz4" in cmd
+
+
+def _sleeper(seconds: float) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-c", f"import time; time.sleep({seconds})"])
+
+
+def test_wait_or_stop_returns_when_process_exits():
+    proc = _sleeper(0)
+    assert sync._wait_or_stop(proc, threading.Event()) is False
+    assert proc.returncode == 0
+
+
+def test_wait_or_stop_terminates_on_stop(monkeypatch):
+    # The stop must wake the wait directly, not on the next recheck
+    monkeypatch.setattr(sync, "_STOP_RECHECK", 30)
+    stop = threading.Event()
+    proc = _sleeper(30)
+    threading.Timer(0.2, stop.set).start()
+    started = time.monotonic()
+    assert sync._wait_or_stop(proc, stop) is True
+    assert time.monotonic() - started < 2
+    assert proc.returncode is not None
+
+
+def test_wait_or_stop_shared_event_stops_every_process():
+    stop = threading.Event()
+    procs = [_sleeper(30) for _ in range(3)]
+    with ThreadPoolExecutor(max_workers=len(procs)) as pool:
+        futures = [pool.submit(sync._wait_or_stop, p, stop) for p in procs]
+        time.sleep(0.2)
+        started = time.monotonic()
+        stop.set()
+        results = [f.result(timeout=10) for f in futures]
+    assert results == [True, True, True]
+    assert time.monotonic() - started < 2
+    assert all(p.returncode is not None for p in procs)
+    # The caller's event is only read, never patched
+    assert "set" not in vars(stop)
+